@@ -0,0 +1,77 @@
+"""Throughput of the embedding backends on a fixed set of page summaries.
+
+The summaries are the first `--n` unique (title, first_paragraph) pairs, by
+title, of a crawl output file (pages, their linked pages and backlinks), so
+every run encodes the same texts. Each backend is warmed up, then encodes
+them all once without touching the embedding store:
+
+    baseline     fp32 on the default device, fixed batches of 24 in input
+                 order (the encoder as relevance.py used to call it)
+    fp32         fp32 on the default device, length-bucketed batches
+    cpu-fp32     fp32 on CPU, length-bucketed batches
+    cpu-int8     dynamic int8 on CPU, length-bucketed batches
+
+and is reported with texts/second and the cosine similarity of its vectors
+to the baseline ones (mean and worst), so quantization error is visible
+next to the speed-up:
+
+    python bench_embed.py --pages wikipedia_final_data.json --n 2000
+    python bench_embed.py --backends baseline,cpu-int8 --threads 8
+"""
+import json
+import time
+import argparse
+import numpy as np
+
+from relevance import get_model, pick_device, encode
+
+BACKENDS = {
+    "baseline": lambda texts, threads: get_model(quantize=False).encode(
+        texts, batch_size=24, convert_to_numpy=True, show_progress_bar=False),
+    "fp32": lambda texts, threads: encode(texts, model=get_model(quantize=False)),
+    "cpu-fp32": lambda texts, threads: encode(texts, model=get_model("cpu", quantize=False, threads=threads)),
+    "cpu-int8": lambda texts, threads: encode(texts, model=get_model("cpu", quantize=True, threads=threads)),
+}
+
+
+def load_summaries(path, n):
+    with open(path, encoding="utf-8") as f:
+        graph = json.load(f)
+    texts = {}
+    for page in graph.values():
+        for p in [page] + page.get("linked_pages", []) + page.get("what_links_here", []):
+            texts.setdefault(p["title"], p["first_paragraph"])
+    return [texts[t] for t in sorted(texts)[:n]]
+
+
+def run(texts, backends, threads=None):
+    results, reference = [], None
+    for name in backends:
+        run_backend = BACKENDS[name]
+        run_backend(texts[:32], threads)  # load the model and warm up
+        t = time.perf_counter()
+        vecs = run_backend(texts, threads)
+        seconds = time.perf_counter() - t
+        if reference is None:
+            reference = vecs
+        cos = np.einsum("ij,ij->i", *(v / np.linalg.norm(v, axis=1, keepdims=True)
+                                      for v in (np.asarray(vecs, dtype=np.float32), reference)))
+        results.append({"backend": name, "texts": len(texts), "seconds": round(seconds, 3),
+                        "texts_per_s": round(len(texts) / seconds, 1),
+                        "cos_mean": round(float(cos.mean()), 5), "cos_min": round(float(cos.min()), 5)})
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", default="wikipedia_final_data.json", help="crawl output JSON")
+    parser.add_argument("--n", type=int, default=2000, help="number of summaries")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma-separated; the first is the reference")
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads (default: all available)")
+    args = parser.parse_args()
+
+    texts = load_summaries(args.pages, args.n)
+    print(f"{len(texts)} summaries, default device {pick_device()}")
+    for r in run(texts, args.backends.split(","), args.threads):
+        print(f"{r['backend']:>10}: {r['texts_per_s']:8.1f} texts/s ({r['seconds']:.1f}s), "
+              f"cosine to {args.backends.split(',')[0]}: mean {r['cos_mean']:.4f}, min {r['cos_min']:.4f}")
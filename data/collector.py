@@ -1,17 +1,21 @@
 import requests
-import json
 from urllib.parse import quote
 import time
-from torch.nn import Threshold
 from links import get_backlinks, get_hyperlinks
 from urllib.parse import unquote, quote
-from relevance import similarity, embed_batch
+from relevance import similarity, similarities, embed_batch
 from tqdm import tqdm
-import os
+import asyncio
+import numpy as np
+from crawler import crawl, MediaWikiClient
+from crawl_store import CrawlStore
 
 THRESHOLD = 0.8
 LIMIT = 10_000
 DEPTH = 3
+MULTI_TARGET = False  # True: keep pages relevant to any of TARGET_PAGES, not just their source
+EMBED_BATCH_SIZE = 128
+CRAWL_DB = "crawl.sqlite"
 
 USER_AGENT = "MyWikipediaBot/1.0 (me@example.com)"
 HEADERS = {"User-Agent": USER_AGENT}
@@ -101,10 +105,50 @@ def fetch_page_data_mw(title: str):
             "first_paragraph": " "
         }
 
-def scrape_wikipedia(target_pages):
+def relevant_pages(candidates, target_embeddings, threshold=THRESHOLD):
+    """The candidates whose summary embedding reaches `threshold` cosine
+    similarity with any row of `target_embeddings`, embedded in large
+    batches and scored in one matrix product."""
+    if not candidates:
+        return []
+    vectors = embed_batch([p["title"] for p in candidates], [p["first_paragraph"] for p in candidates],
+                          batch_size=EMBED_BATCH_SIZE)
+    scores = similarities(vectors, np.atleast_2d(target_embeddings)).max(axis=1)
+    return [p for p, s in zip(candidates, scores) if s >= threshold]
+
+async def _summaries(titles):
+    async with MediaWikiClient() as client:
+        return await client.summaries(titles)
+
+def embed_targets(titles=TARGET_PAGES):
+    pages = asyncio.run(_summaries(titles))
+    found = [t for t in titles if pages.get(t)]
+    return embed_batch(found, [pages[t]["first_paragraph"] for t in found])
+
+def scrape_wikipedia(target_pages, store, depth=0, multi_target=MULTI_TARGET):
+    # concurrent, rate-limited fetching (crawler.py); each page's links and
+    # backlinks are embedded and scored as one batch, against the page
+    # itself or, with multi_target, against every TARGET_PAGES page too.
+    # Kept pages are recorded in `store` and queued at depth + 1
+    targets = embed_targets() if multi_target else None
+
+    def on_page(page_title, page_data, linked, backlinks):
+        print(f"Processing: {page_title}")
+        target = embed_batch([page_title], [page_data["first_paragraph"]])
+        if targets is not None:
+            target = np.vstack([target, targets])
+
+        kept = {id(p) for p in relevant_pages(linked + backlinks, target)}
+        page_data["linked_pages"] = [p for p in linked if id(p) in kept]
+        page_data["what_links_here"] = [p for p in backlinks if id(p) in kept]
+        store.record_page(page_title, page_data, depth)
+
+    stats = asyncio.run(crawl(target_pages, on_page, limit=LIMIT, on_missing=store.mark_missing))
+    print(f"Crawl stats: {stats}")
+
+def scrape_wikipedia_sequential(target_pages, store, depth=0):
     
     for page_title in target_pages:
-        results = {}
         print(f"Processing: {page_title}")
 
         first_para = fetch_page_data_mw(page_title)['first_paragraph']
@@ -148,71 +192,27 @@ def scrape_wikipedia(target_pages):
                     backlink_pages.append(page_info)
         
         page_data["what_links_here"] = backlink_pages
-        results[page_title] = page_data
-        save_to_json(results)
+        store.record_page(page_title, page_data, depth)
 
 
 
-def save_to_json(results):
-    all_pages = {}
-    all_links = []
-
-    for source_title, data in results.items():
-        all_pages[source_title] = {
-            "title": data["title"],
-            "url": data["url"],
-            "first_paragraph": data["first_paragraph"]
-        }
-
-        for linked in data.get("linked_pages", []):
-            linked_title = linked["title"]
-            all_pages[linked_title] = linked
-            all_links.append({
-                "source_title": source_title,
-                "target_title": linked_title,
-                "link_type": "linked"
-            })
-
-        for backlink in data.get("what_links_here", []):
-            backlink_title = backlink["title"]
-            all_pages[backlink_title] = backlink
-            all_links.append({
-                "source_title": backlink_title,
-                "target_title": source_title,
-                "link_type": "backlink"
-            })
-
-    with open("pages.json", "a", encoding="utf-8") as f:
-        json.dump(list(all_pages.values()), f, indent=2, ensure_ascii=False)
-
-    with open("links.json", "a", encoding="utf-8") as f:
-        json.dump(all_links, f, indent=2, ensure_ascii=False)
-
-
 if __name__ == "__main__":
-    # scrape_wikipedia()
-    scraped: set[str] = set()  # everything we have already processed
-    if os.path.exists("pages.json"):
-        with open("pages.json", encoding="utf-8") as f:
-            current_titles = {p["title"] for p in json.load(f)}
-            frontier: list[str] = list(current_titles)
-            print(f"Continuing where we left off, from pages.json, starting with frontier = {len(frontier)}")
+    # the frontier and pages live in CRAWL_DB, so an interrupted crawl picks
+    # up at the lowest depth with pages still pending, without refetching
+    store = CrawlStore(CRAWL_DB)
+    if store.seed(TARGET_PAGES):
+        print(f"Seeded the frontier with {len(TARGET_PAGES)} target pages")
     else:
-        frontier: list[str] = TARGET_PAGES[:]  # pages to process in this layer
+        print(f"Continuing where we left off, from depth {store.resume_depth()}")
 
-    for _ in range(DEPTH):
+    for depth in range(DEPTH):
+        frontier = store.pending(depth)
         if not frontier:
-            print("nothing left to expand, quitting")
-            break  # nothing left to expand
-        else:
-            print(f"Starting with frontier = {len(frontier)}")
-
-        scrape_wikipedia(frontier)  # ← uses the modified signature
-        scraped.update(frontier)
-
-        # collect titles just written to pages.json
-        with open("pages.json", encoding="utf-8") as f:
-            current_titles = {p["title"] for p in json.load(f)}
+            continue
+        print(f"Starting depth {depth} with frontier = {len(frontier)}")
+        scrape_wikipedia(frontier, store, depth)
+        print(f"Frontier: {store.stats()['frontier']}")
 
-        # new nodes = pages we just discovered minus everything we have seen
-        frontier = list(current_titles - scraped)
\ No newline at end of file
+    store.export_json("pages.json", "links.json")
+    stats = store.stats()
+    print(f"{stats['pages']} pages, {stats['links']} links written to pages.json / links.json")
@@ -0,0 +1,144 @@
+"""Durable crawl frontier and page/link store (SQLite).
+
+Replaces appending a JSON array per page to ``pages.json`` / ``links.json``
+(which left neither file valid JSON) and the in-memory ``scraped`` set. One
+SQLite file in WAL mode holds:
+
+    pages     title -> url, first_paragraph; one row per page however
+              often it is found
+    links     (source_title, target_title, link_type), deduplicated, with
+              the same direction as before: "linked" source -> linked page,
+              "backlink" backlinking page -> source
+    frontier  title -> depth it was discovered at, state (pending, done,
+              missing) and when it was expanded
+
+``record_page`` stores an expanded page, its kept links and their titles as
+pending at the next depth, and marks the page done, all in one transaction:
+a crash loses at most the pages being expanded at the time, and resuming
+only fetches titles still pending, lowest depth first. Every title keeps the
+depth it was first discovered at, so a page found again later is never
+expanded twice.
+
+    store = CrawlStore("crawl.sqlite")
+    store.seed(TARGET_PAGES)
+    for depth in range(DEPTH):
+        scrape_wikipedia(store.pending(depth), store, depth)
+    store.export_json("pages.json", "links.json")
+"""
+import json
+import time
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    title TEXT PRIMARY KEY,
+    url TEXT,
+    first_paragraph TEXT
+);
+CREATE TABLE IF NOT EXISTS links (
+    source_title TEXT NOT NULL,
+    target_title TEXT NOT NULL,
+    link_type TEXT NOT NULL,
+    PRIMARY KEY (source_title, target_title, link_type)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS frontier (
+    title TEXT PRIMARY KEY,
+    depth INTEGER NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    expanded_at REAL
+);
+CREATE INDEX IF NOT EXISTS frontier_state ON frontier (state, depth);
+"""
+
+
+class CrawlStore:
+    def __init__(self, path):
+        self.path = path
+        # the crawl calls back from a worker thread; every use holds the lock
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    # -- frontier --
+
+    def seed(self, titles, depth=0):
+        """Enqueue `titles` at `depth` unless already known; returns how many were new."""
+        with self._lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany("INSERT OR IGNORE INTO frontier (title, depth) VALUES (?, ?)",
+                                [(t, depth) for t in titles])
+            return self.db.total_changes - before
+
+    def pending(self, depth):
+        """Titles discovered at `depth` and not yet expanded."""
+        with self._lock:
+            return [t for (t,) in self.db.execute(
+                "SELECT title FROM frontier WHERE state = 'pending' AND depth = ? ORDER BY rowid", (depth,))]
+
+    def resume_depth(self):
+        """Lowest depth with pending titles, or None."""
+        with self._lock:
+            return self.db.execute("SELECT MIN(depth) FROM frontier WHERE state = 'pending'").fetchone()[0]
+
+    def mark_missing(self, title):
+        """`title` has no page; it is not fetched again."""
+        with self._lock, self.db:
+            self.db.execute("UPDATE frontier SET state = 'missing', expanded_at = ? WHERE title = ?",
+                            (time.time(), title))
+
+    # -- pages --
+
+    def record_page(self, page_title, page_data, depth):
+        """Store the expanded `page_title` with its kept "linked_pages" and
+        "what_links_here", enqueue their titles at depth + 1 and mark it
+        done, atomically."""
+        linked = page_data.get("linked_pages", [])
+        backlinks = page_data.get("what_links_here", [])
+        source = page_data["title"]
+        now = time.time()
+        with self._lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                            (source, page_data["url"], page_data["first_paragraph"]))
+            self.db.executemany("INSERT OR IGNORE INTO pages VALUES (?, ?, ?)",
+                                [(p["title"], p["url"], p["first_paragraph"]) for p in linked + backlinks])
+            self.db.executemany("INSERT OR IGNORE INTO links VALUES (?, ?, ?)",
+                                [(source, p["title"], "linked") for p in linked]
+                                + [(p["title"], source, "backlink") for p in backlinks])
+            self.db.executemany("INSERT OR IGNORE INTO frontier (title, depth) VALUES (?, ?)",
+                                [(p["title"], depth + 1) for p in linked + backlinks])
+            # the requested title and the page's canonical one are both expanded now
+            for title in {page_title, source}:
+                self.db.execute("INSERT INTO frontier (title, depth, state, expanded_at) VALUES (?, ?, 'done', ?) "
+                                "ON CONFLICT (title) DO UPDATE SET state = 'done', expanded_at = excluded.expanded_at",
+                                (title, depth, now))
+
+    # -- reporting --
+
+    def stats(self):
+        """{"pages", "links", "frontier": {depth: {state: count}}}."""
+        with self._lock:
+            frontier = {}
+            for depth, state, n in self.db.execute(
+                    "SELECT depth, state, COUNT(*) FROM frontier GROUP BY depth, state ORDER BY depth"):
+                frontier.setdefault(depth, {})[state] = n
+            return {"pages": self.db.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+                    "links": self.db.execute("SELECT COUNT(*) FROM links").fetchone()[0],
+                    "frontier": frontier}
+
+    def export_json(self, pages_path="pages.json", links_path="links.json"):
+        """Write every page and link as one valid JSON array each."""
+        with self._lock:
+            with open(pages_path, "w", encoding="utf-8") as f:
+                json.dump([{"title": t, "url": u, "first_paragraph": p}
+                           for t, u, p in self.db.execute("SELECT title, url, first_paragraph FROM pages")],
+                          f, indent=2, ensure_ascii=False)
+            with open(links_path, "w", encoding="utf-8") as f:
+                json.dump([{"source_title": s, "target_title": t, "link_type": k}
+                           for s, t, k in self.db.execute("SELECT source_title, target_title, link_type FROM links")],
+                          f, indent=2, ensure_ascii=False)
@@ -0,0 +1,259 @@
+"""Asyncio crawl engine for the MediaWiki API.
+
+``MediaWikiClient`` keeps one pooled keep-alive ``aiohttp`` session, caps the
+requests in flight, and sends every request through one ``TokenBucket``
+shared by the whole crawl. Every API call carries ``maxlag``; a ``maxlag``
+error, a 429 or a 503 pauses the bucket for ``Retry-After`` seconds (or an
+exponential backoff) before the request is retried, so all workers back off
+together instead of hammering a lagged replica.
+
+Page summaries are fetched 50 titles per ``action=query`` (continuations
+are followed, ``extracts`` only returns 20 intros per response) and mapped
+back to the requested titles through ``normalized`` / ``redirects``.
+
+``crawl`` expands several source pages concurrently and hands each one,
+with the summaries of all its links and backlinks, to a callback that runs
+in a worker thread, one page at a time, while fetching carries on.
+
+Base URLs are parameters, so the engine can be pointed at a local stand-in
+server (mediawiki_standin.py, which tests/test_crawler.py crawls):
+
+    async with MediaWikiClient(api_base="http://127.0.0.1:8080/w/api.php",
+                               wiki_base="http://127.0.0.1:8080/wiki") as client:
+        pages = await client.summaries(["Joe Biden", "Kamala Harris"])
+"""
+import time
+import asyncio
+import random
+from urllib.parse import quote, unquote
+
+import aiohttp
+
+from links import parse_hyperlinks
+
+API_BASE = "https://en.wikipedia.org/w/api.php"
+WIKI_BASE = "https://en.wikipedia.org/wiki"
+USER_AGENT = "MyWikipediaBot/1.0 (me@example.com)"
+
+BATCH_TITLES = 50        # titles per action=query
+RATE = 20.0              # requests per second, whole crawl
+BURST = 20
+MAX_IN_FLIGHT = 16
+MAX_PAGES_IN_FLIGHT = 4  # source pages expanded at once
+MAXLAG = 5
+RETRIES = 6
+
+
+class TokenBucket:
+    def __init__(self, rate=RATE, burst=BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Hold every request for `seconds` from now."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(headers, attempt):
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return min(2 ** attempt, 60) * (1 + random.random() / 4)
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+class MediaWikiClient:
+    def __init__(self, api_base=API_BASE, wiki_base=WIKI_BASE, limiter=None,
+                 max_in_flight=MAX_IN_FLIGHT, maxlag=MAXLAG, retries=RETRIES, user_agent=USER_AGENT):
+        self.api_base = api_base
+        self.wiki_base = wiki_base
+        self.limiter = limiter or TokenBucket()
+        self.max_in_flight = max_in_flight
+        self.maxlag = maxlag
+        self.retries = retries
+        self.headers = {"User-Agent": user_agent}
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "errors": 0}
+        self.session = None
+
+    async def __aenter__(self):
+        self._slots = asyncio.Semaphore(self.max_in_flight)
+        self.session = aiohttp.ClientSession(
+            headers=self.headers,
+            connector=aiohttp.TCPConnector(limit=self.max_in_flight, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=60))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+
+    async def _get(self, url, params=None, as_json=True):
+        if as_json:
+            params = {**params, "format": "json", "maxlag": self.maxlag}
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            async with self._slots:
+                self.stats["requests"] += 1
+                try:
+                    async with self.session.get(url, params=params) as resp:
+                        if resp.status in (429, 503):
+                            wait = _retry_after(resp.headers, attempt)
+                            self.stats["throttled"] += 1
+                        else:
+                            resp.raise_for_status()
+                            if not as_json:
+                                return await resp.text()
+                            data = await resp.json(content_type=None)
+                            if data.get("error", {}).get("code") != "maxlag":
+                                return data
+                            wait = _retry_after(resp.headers, attempt)
+                            self.stats["throttled"] += 1
+                except aiohttp.ClientResponseError as e:
+                    if e.status < 500 or attempt == self.retries:
+                        raise
+                    wait = _retry_after({}, attempt)
+                except (aiohttp.ClientError, asyncio.TimeoutError):
+                    if attempt == self.retries:
+                        raise
+                    wait = _retry_after({}, attempt)
+            self.stats["retries"] += 1
+            self.limiter.pause(wait)
+        raise aiohttp.ClientError(f"gave up on {url} after {self.retries} retries")
+
+    async def query(self, params, limit=None):
+        """Every response of an action=query, following continuations."""
+        params = {"action": "query", **params}
+        responses, seen = [], 0
+        while True:
+            data = await self._get(self.api_base, params)
+            responses.append(data)
+            seen += sum(len(v) for v in data.get("query", {}).values() if isinstance(v, list))
+            if "continue" not in data or (limit is not None and seen >= limit):
+                return responses
+            params = {**params, **data["continue"]}
+
+    async def _summary_chunk(self, titles):
+        params = {"prop": "extracts|info", "exintro": 1, "explaintext": 1, "exlimit": "max",
+                  "inprop": "url", "redirects": 1, "titles": "|".join(titles)}
+        try:
+            responses = await self.query(params)
+        except aiohttp.ClientError as e:
+            self.stats["errors"] += 1
+            print(f"Error fetching summaries for {len(titles)} titles: {e}")
+            return {t: None for t in titles}
+
+        renamed, pages = {}, {}
+        for data in responses:
+            q = data.get("query", {})
+            for step in q.get("normalized", []) + q.get("redirects", []):
+                renamed[step["from"]] = step["to"]
+            for page in q.get("pages", {}).values():
+                info = pages.setdefault(page.get("title"), {"title": page.get("title"), "url": "",
+                                                            "first_paragraph": "No intro found."})
+                if page.get("fullurl"):
+                    info["url"] = page["fullurl"]
+                if "extract" in page:
+                    info["first_paragraph"] = page["extract"]
+                if "missing" in page or "invalid" in page:
+                    info["missing"] = True
+
+        result = {}
+        for t in titles:
+            final, hops = t, 0
+            while final in renamed and hops < 10:
+                final, hops = renamed[final], hops + 1
+            result[t] = pages.get(final)
+        return result
+
+    async def summaries(self, titles):
+        """{title: {"title", "url", "first_paragraph"} or None}, 50 titles per
+        request. None means the fetch failed; pages the wiki reports missing or
+        invalid come back with "missing": True."""
+        titles = list(dict.fromkeys(unquote(t) for t in titles))
+        chunks = await asyncio.gather(*(self._summary_chunk(c) for c in _chunks(titles, BATCH_TITLES)))
+        return {t: info for chunk in chunks for t, info in chunk.items()}
+
+    async def backlinks(self, title, limit=None):
+        params = {"list": "backlinks", "bltitle": title, "blnamespace": 0, "bllimit": 500}
+        links = [l["title"] for data in await self.query(params, limit)
+                 for l in data["query"]["backlinks"]]
+        links = [i.split('/')[-1] for i in links]
+        return links if limit is None else links[:limit]
+
+    async def hyperlinks(self, title, limit=None):
+        html = await self._get(f"{self.wiki_base}/{quote(title, safe='/:%')}", as_json=False)
+        links = parse_hyperlinks(html)
+        return links if limit is None else links[:limit]
+
+
+async def expand_page(client, page_title, limit=None):
+    """(page summary, linked page summaries, backlink summaries); the page
+    summary is None when it could not be fetched, and a missing page has no
+    links (its /wiki/ fetch 404s)."""
+    pages, linked, backlinks = await asyncio.gather(
+        client.summaries([page_title]), client.hyperlinks(page_title, limit), client.backlinks(page_title, limit),
+        return_exceptions=True)
+    if isinstance(pages, BaseException):
+        raise pages
+    page = pages[unquote(page_title)]
+    if page is None or page.get("missing"):
+        return page, [], []
+    for result in (linked, backlinks):
+        if isinstance(result, BaseException):
+            raise result
+    infos = await client.summaries(linked + backlinks)
+    return (page,
+            [infos[unquote(t)] for t in linked if infos.get(unquote(t))],
+            [infos[unquote(t)] for t in backlinks if infos.get(unquote(t))])
+
+async def crawl(target_pages, on_page, limit=None, max_pages_in_flight=MAX_PAGES_IN_FLIGHT, on_missing=None,
+                **client_options):
+    """Expand every page of `target_pages` and call
+    on_page(page_title, page, linked_pages, backlink_pages) for each in a
+    worker thread, one at a time; on_missing(page_title), if given, for
+    titles the API reports missing or invalid. Pages that could not be
+    fetched get neither callback, so they stay pending for the next run.
+    Returns the client stats."""
+    pages_in_flight = asyncio.Semaphore(max_pages_in_flight)
+    callback = asyncio.Lock()
+
+    async with MediaWikiClient(**client_options) as client:
+        async def one(page_title):
+            async with pages_in_flight:
+                try:
+                    page, linked, backlinks = await expand_page(client, page_title, limit)
+                except aiohttp.ClientError as e:
+                    print(f"Error expanding {page_title}: {e}")
+                    return
+            if page is None:
+                print(f"Could not fetch {page_title}; leaving it pending")
+                return
+            if page.get("missing"):
+                if on_missing is not None:
+                    async with callback:
+                        await asyncio.to_thread(on_missing, page_title)
+                return
+            async with callback:
+                await asyncio.to_thread(on_page, page_title, page, linked, backlinks)
+
+        await asyncio.gather(*(one(t) for t in target_pages))
+        return client.stats
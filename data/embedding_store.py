@@ -0,0 +1,217 @@
+"""Memory-mapped, append-only store of title embeddings.
+
+Replaces the ``embeddings.pkl`` dict that was unpickled whole at import and
+rewritten at exit. A store directory holds:
+
+    meta.json     {"dim": d, "dtype": "float32" | "float16"}, written once
+    vectors.bin   raw row-major vectors, one row per embedded title
+    index.jsonl   one ["title", row] line per title, append-only
+
+Only the title -> row index is held in memory; vectors are read through a
+``np.memmap`` of ``vectors.bin`` (the OS pages in what is used), and the
+most recently read rows are kept as float32 in a bounded LRU hot cache.
+
+Writers append under an exclusive ``flock`` on ``lock``: vectors first,
+fsynced, then their index lines, fsynced, so a title only becomes visible
+once its vector is on disk. A crash can leave unindexed rows, the last
+one possibly torn, at the end of ``vectors.bin`` (readers map whole rows
+only and never look up unindexed ones; the next writer cuts them off) or a
+torn last index line (ignored by readers, cut off by the next writer);
+nothing already committed is lost. Readers take no lock: they pick up lines appended by other
+processes on ``refresh()``, which ``get_many`` calls for unknown titles.
+
+    store = EmbeddingStore("embeddings")
+    store.add_many(["Joe Biden"], vectors)
+    matrix = store.get_many(["Joe Biden"])
+"""
+import os
+import json
+import fcntl
+import pickle
+import itertools
+import threading
+import numpy as np
+from collections import OrderedDict
+
+HOT_CACHE = 50_000  # rows kept as float32 in memory
+
+
+class EmbeddingStore:
+    def __init__(self, path, dtype="float32", hot_cache=HOT_CACHE):
+        """Open (or create) the store at directory `path`; `dtype` only
+        applies to a new store, an existing one keeps the dtype it was
+        created with."""
+        self.path = path
+        self.dtype = np.dtype(dtype)
+        self.dim = None
+        self.hot_cache = hot_cache
+        self._rows = {}
+        self._hot = OrderedDict()
+        self._offset = 0
+        self._mmap = None
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+        self._read_meta()
+        self.refresh()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._file("meta.json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        self.dim, self.dtype = meta["dim"], np.dtype(meta["dtype"])
+
+    # -- reading --
+
+    def refresh(self):
+        """Pick up index lines appended since the last call (by any process)."""
+        with self._lock:
+            try:
+                with open(self._file("index.jsonl"), "rb") as f:
+                    f.seek(self._offset)
+                    data = f.read()
+            except FileNotFoundError:
+                return
+            end = data.rfind(b"\n") + 1  # a torn last line is not committed yet
+            for line in data[:end].splitlines():
+                title, row = json.loads(line)
+                self._rows[title] = row
+            self._offset += end
+            if self._rows and self.dim is None:
+                self._read_meta()
+
+    def _vectors(self, max_row):
+        if self._mmap is None or len(self._mmap) <= max_row:
+            # map whole rows only: a writer may be mid-append, or have
+            # crashed, leaving part of a row at the end
+            path = self._file("vectors.bin")
+            rows = os.path.getsize(path) // (self.dim * self.dtype.itemsize)
+            self._mmap = (np.memmap(path, dtype=self.dtype, mode="r", shape=(rows, self.dim)) if rows
+                          else np.empty((0, self.dim), dtype=self.dtype))
+        return self._mmap
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, title):
+        return title in self._rows
+
+    def get(self, title):
+        """float32 vector of `title`, or None."""
+        return self.get_many([title])[0] if title in self else None
+
+    def get_many(self, titles):
+        """len(titles) x dim float32 matrix; KeyError for an unknown title."""
+        with self._lock:
+            if any(t not in self._rows for t in titles):
+                self.refresh()
+            out = np.empty((len(titles), self.dim or 0), dtype=np.float32)
+            cold = []
+            for i, t in enumerate(titles):
+                vec = self._hot.get(t)
+                if vec is None:
+                    cold.append(i)
+                else:
+                    self._hot.move_to_end(t)
+                    out[i] = vec
+            if cold:
+                rows = np.array([self._rows[titles[i]] for i in cold], dtype=np.int64)
+                out[cold] = self._vectors(rows.max())[rows]
+                for i in cold:
+                    self._remember(titles[i], out[i].copy())
+            return out
+
+    def entries(self, start=0):
+        """[(title, row)] of every stored title from the `start`-th on, in
+        the order they were appended (so callers can follow the store
+        incrementally)."""
+        with self._lock:
+            self.refresh()
+            return list(itertools.islice(self._rows.items(), start, None))
+
+    def vectors(self):
+        """Memory map of every stored row, in the stored dtype."""
+        with self._lock:
+            self.refresh()
+            if not self._rows:
+                return np.empty((0, self.dim or 0), dtype=self.dtype)
+            return self._vectors(max(self._rows.values()))
+
+    def _remember(self, title, vec):
+        self._hot[title] = vec
+        self._hot.move_to_end(title)
+        while len(self._hot) > self.hot_cache:
+            self._hot.popitem(last=False)
+
+    # -- writing --
+
+    def add_many(self, titles, vectors):
+        """Durably append the vectors of titles not stored yet; returns how
+        many were added."""
+        vectors = np.asarray(vectors)
+        with self._lock, open(self._file("lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.refresh()
+                if self.dim is None:
+                    self._create(vectors.shape[1])
+                new = {}
+                for t, vec in zip(titles, vectors):
+                    if t not in self._rows and t not in new:
+                        new[t] = vec
+                if not new:
+                    return 0
+                return self._append(new)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _create(self, dim):
+        self.dim = int(dim)
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._file("meta.json"))
+
+    def _append(self, new):
+        row_bytes = self.dim * self.dtype.itemsize
+        with open(self._file("vectors.bin"), "ab") as f:
+            # everything past the last indexed row is left over from a
+            # crashed writer (a live one would hold the lock): cut it off
+            first = max(self._rows.values()) + 1 if self._rows else 0
+            if f.seek(0, os.SEEK_END) > first * row_bytes:
+                f.truncate(first * row_bytes)
+            f.write(np.asarray(list(new.values()), dtype=self.dtype).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        lines = b"".join(json.dumps([t, first + k], ensure_ascii=False).encode("utf-8") + b"\n"
+                         for k, t in enumerate(new))
+        with open(self._file("index.jsonl"), "ab+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end:
+                f.seek(end - 1)
+                if f.read(1) != b"\n":  # cut a torn line off
+                    f.truncate(self._offset)
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+        for t, vec in new.items():
+            # the value as stored, so a float16 store reads the same from either
+            self._remember(t, np.asarray(vec, dtype=self.dtype).astype(np.float32))
+        return len(new)
+
+    def import_pickle(self, path):
+        """Add every {title: vector} of a pickled dict (the old embeddings.pkl)."""
+        with open(path, "rb") as f:
+            cache = pickle.load(f)
+        if not cache:
+            return 0
+        titles = list(cache)
+        return self.add_many(titles, np.stack([cache[t] for t in titles]))
@@ -35,10 +35,8 @@ def get_backlinks(title: str, limit: int=None) -> List:
     return backlinks[:limit] # get 1000 links randomly
 
 
-def get_hyperlinks(article_title: str, limit: int=None) -> List:
-    url = f"https://en.wikipedia.org/wiki/{article_title}"
-    response = requests.get(url)
-    soup = BeautifulSoup(response.content, "html.parser")
+def parse_hyperlinks(html) -> List:
+    soup = BeautifulSoup(html, "html.parser")
 
     base_url = "https://en.wikipedia.org"
     links = set()
@@ -49,7 +47,12 @@ def get_hyperlinks(article_title: str, limit: int=None) -> List:
             full_url = urljoin(base_url, href)
             links.add(full_url)
 
-    links = [i.split('/')[-1] for i in links]
+    return [i.split('/')[-1] for i in links]
+
+def get_hyperlinks(article_title: str, limit: int=None) -> List:
+    url = f"https://en.wikipedia.org/wiki/{article_title}"
+    response = requests.get(url)
+    links = parse_hyperlinks(response.content)
     if limit is None:
         return links
     # return random.sample(sorted(links), limit) # get 1000 links randomly
@@ -0,0 +1,184 @@
+"""Local stand-in for the parts of the MediaWiki API the crawler uses.
+
+Serves ``/w/api.php`` (``action=query`` with ``prop=extracts|info`` and
+``list=backlinks``) and ``/wiki/<title>`` pages from an in-memory wiki, the
+way en.wikipedia.org answers them:
+
+    titles      underscores are normalized to spaces (reported in
+                ``normalized``), redirects are followed when asked
+                (``redirects``), unknown titles come back flagged ``missing``
+                and their /wiki/ page is a 404
+    extracts    at most `extract_limit` intros per response, the rest behind
+                ``continue``/``excontinue``
+    backlinks   `backlink_page` titles per response, the rest behind
+                ``continue``/``blcontinue``
+
+and injects the failures the client has to ride out: the next `maxlag`
+API requests get a ``maxlag`` error and the next `throttle` requests (API
+or page) a 429, both with ``Retry-After``; while `down` every API request
+is a 500 (the /wiki/ pages still load), and so is every summary request
+naming one of the `broken` titles.
+
+    wiki = StandInWiki({"Joe Biden": {"extract": "...", "links": ["Kamala Harris"]}})
+    async with wiki.serving() as (api_base, wiki_base):
+        await crawl(["Joe Biden"], on_page, api_base=api_base, wiki_base=wiki_base)
+
+    python mediawiki_standin.py --port 8080    # a small demo wiki
+"""
+import argparse
+from contextlib import asynccontextmanager
+from html import escape
+from urllib.parse import quote
+
+from aiohttp import web
+
+EXTRACT_LIMIT = 20
+BACKLINK_PAGE = 500
+
+
+class StandInWiki:
+    def __init__(self, pages, redirects=None, extract_limit=EXTRACT_LIMIT, backlink_page=BACKLINK_PAGE,
+                 retry_after=0):
+        # pages: {title: {"extract": str, "links": [titles]}}; backlinks are
+        # derived from the links
+        self.pages = pages
+        self.redirects = redirects or {}
+        self.extract_limit = extract_limit
+        self.backlink_page = backlink_page
+        self.retry_after = retry_after
+        self.maxlag = 0
+        self.throttle = 0
+        self.down = False
+        self.broken = set()
+        self.requests = []
+        self.wiki_base = ""
+
+    def backlinks_of(self, title):
+        return sorted(t for t, p in self.pages.items() if title in p.get("links", ()))
+
+    # -- handlers --
+
+    def _fault(self, api=True):
+        if api and self.down:
+            return web.Response(status=500, text="stand-in outage")
+        if self.throttle:
+            self.throttle -= 1
+            return web.Response(status=429, headers={"Retry-After": str(self.retry_after)})
+        if api and self.maxlag:
+            self.maxlag -= 1
+            return web.json_response({"error": {"code": "maxlag", "info": "Waiting for a replica"}},
+                                     headers={"Retry-After": str(self.retry_after)})
+        return None
+
+    async def api(self, request):
+        q = request.query
+        self.requests.append(dict(q))
+        fault = self._fault()
+        if fault is not None:
+            return fault
+        if self.broken & set(q.get("titles", "").split("|")):
+            return web.Response(status=500, text="stand-in failure")
+        if q.get("action") != "query":
+            return web.json_response({"error": {"code": "badvalue"}})
+        if "titles" in q:
+            return web.json_response(self._pages(q))
+        if q.get("list") == "backlinks":
+            return web.json_response(self._backlinks(q))
+        return web.json_response({"batchcomplete": ""})
+
+    def _pages(self, q):
+        query, pages = {"normalized": [], "redirects": []}, {}
+        wanted = []
+        for title in q["titles"].split("|"):
+            if "_" in title:
+                query["normalized"].append({"from": title, "to": title.replace("_", " ")})
+                title = title.replace("_", " ")
+            if q.get("redirects") and title in self.redirects:
+                query["redirects"].append({"from": title, "to": self.redirects[title]})
+                title = self.redirects[title]
+            wanted.append(title)
+
+        start = int(q.get("excontinue", 0))
+        extracts = wanted[start:start + self.extract_limit]
+        for k, title in enumerate(dict.fromkeys(wanted)):
+            if title not in self.pages:
+                pages[str(-1 - k)] = {"ns": 0, "title": title, "missing": ""}
+                continue
+            page = {"pageid": k + 1, "ns": 0, "title": title,
+                    "fullurl": f"{self.wiki_base}/{quote(title.replace(' ', '_'))}"}
+            if title in extracts:
+                page["extract"] = self.pages[title].get("extract", "")
+            pages[str(k + 1)] = page
+        query["pages"] = pages
+
+        data = {"query": {k: v for k, v in query.items() if v}}
+        if start + self.extract_limit < len(wanted):
+            data["continue"] = {"excontinue": start + self.extract_limit, "continue": "||"}
+        else:
+            data["batchcomplete"] = ""
+        return data
+
+    def _backlinks(self, q):
+        titles = self.backlinks_of(q["bltitle"])
+        start = int(q.get("blcontinue", 0))
+        size = min(int(q.get("bllimit", self.backlink_page)), self.backlink_page)
+        data = {"query": {"backlinks": [{"ns": 0, "title": t} for t in titles[start:start + size]]}}
+        if start + size < len(titles):
+            data["continue"] = {"blcontinue": str(start + size), "continue": "-||"}
+        else:
+            data["batchcomplete"] = ""
+        return data
+
+    async def article(self, request):
+        self.requests.append({"wiki": request.match_info["title"]})
+        fault = self._fault(api=False)
+        if fault is not None:
+            return fault
+        title = request.match_info["title"].replace("_", " ")
+        title = self.redirects.get(title, title)
+        if title not in self.pages:
+            return web.Response(status=404, text="no such page")
+        links = "".join(f'<a href="/wiki/{quote(t.replace(" ", "_"))}">{escape(t)}</a>'
+                        for t in self.pages[title].get("links", ()))
+        return web.Response(text=f'<html><body><div class="mw-parser-output">{links}</div></body></html>',
+                            content_type="text/html")
+
+    # -- serving --
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/w/api.php", self.api)
+        app.router.add_get("/wiki/{title:.+}", self.article)
+        return app
+
+    @asynccontextmanager
+    async def serving(self, host="127.0.0.1", port=0):
+        """Serve on `host`:`port` (a free port by default); yields (api_base, wiki_base)."""
+        runner = web.AppRunner(self.app())
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        await site.start()
+        port = runner.addresses[0][1]
+        self.wiki_base = f"http://{host}:{port}/wiki"
+        try:
+            yield f"http://{host}:{port}/w/api.php", self.wiki_base
+        finally:
+            await runner.cleanup()
+
+
+def demo_wiki():
+    """A few linked pages, enough for a depth-2 crawl."""
+    names = ["Joe Biden", "Donald Trump", "Kamala Harris", "Mike Pence",
+             "2020 United States presidential election", "United States presidential debates, 2020"]
+    return StandInWiki({n: {"extract": f"{n} is a page of the stand-in wiki.",
+                            "links": [m for m in names if m != n]} for n in names})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    wiki = demo_wiki()
+    wiki.wiki_base = f"http://{args.host}:{args.port}/wiki"
+    web.run_app(wiki.app(), host=args.host, port=args.port)
@@ -1,33 +1,77 @@
+import os
 import json
 import numpy as np
-from sentence_transformers import SentenceTransformer
-import pandas as pd
-import matplotlib.pyplot
 import time
-import pickle, atexit
 from pathlib import Path
 from collections.abc import Sequence                       # for type hint
 import numpy as np
 
-_CACHE_F = Path("embeddings.pkl")
-try:
-    _EMB_CACHE: dict[str, np.ndarray] = pickle.load(_CACHE_F.open("rb"))
-except FileNotFoundError:
-    _EMB_CACHE = {}
+from embedding_store import EmbeddingStore
 
-def _flush_cache() -> None:
-    with _CACHE_F.open("wb") as fp:
-        pickle.dump(_EMB_CACHE, fp, protocol=pickle.HIGHEST_PROTOCOL)
+EMB_DIR = "embeddings"
+EMB_DTYPE = "float32"  # "float16" halves the vector file; set before the store is first created
+_LEGACY_CACHE_F = Path("embeddings.pkl")
 
-atexit.register(_flush_cache)
 
+MODEL_NAME = 'bert-base-nli-mean-tokens'
+DEVICE = None         # None: cuda if available, then mps, else cpu
+CPU_QUANTIZE = True   # dynamic int8 Linear layers when running on CPU
+CPU_THREADS = None    # None: every core this process may run on
+BATCH_TOKENS = 8192   # rough token budget per encode batch
 
+_MODELS = {}
+_STORE = None
 
-t1 = time.time()
-MODEL = SentenceTransformer(
-    'bert-base-nli-mean-tokens',
-    device="cuda:0")
-print(f"Loaded BERT model in {time.time() - t1} seconds")
+
+def pick_device() -> str:
+    import torch
+    if torch.cuda.is_available():
+        return "cuda:0"
+    if getattr(torch.backends, "mps", None) is not None and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
+
+def cpu_threads() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def get_model(device: str | None = None, quantize: bool | None = None, threads: int | None = None):
+    """The sentence encoder, loaded on first use (so cache-only runs never
+    import torch). On CPU, torch uses `threads` threads and, unless
+    `quantize` is False, the Linear layers run as dynamic int8."""
+    device = device or DEVICE or pick_device()
+    quantize = (CPU_QUANTIZE if quantize is None else quantize) and device == "cpu"
+    key = (device, quantize)
+    if key not in _MODELS:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        t1 = time.time()
+        if device == "cpu":
+            torch.set_num_threads(threads or CPU_THREADS or cpu_threads())
+        model = SentenceTransformer(MODEL_NAME, device=device)
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        model.eval()
+        print(f"Loaded {MODEL_NAME} on {device}{' (int8)' if quantize else ''} in {time.time() - t1:.1f} seconds")
+        _MODELS[key] = model
+    return _MODELS[key]
+
+
+def get_store() -> EmbeddingStore:
+    """The embedding store, opened (and created) on first use, so importing
+    this module never touches the disk; an old embeddings.pkl is imported
+    into an empty store."""
+    global _STORE
+    if _STORE is None:
+        _STORE = EmbeddingStore(EMB_DIR, dtype=EMB_DTYPE)
+        if not len(_STORE) and _LEGACY_CACHE_F.exists():
+            print(f"Imported {_STORE.import_pickle(_LEGACY_CACHE_F)} embeddings from {_LEGACY_CACHE_F}")
+    return _STORE
 
 
 def similarity(a: np.ndarray, b: np.ndarray) -> float:
@@ -35,100 +79,208 @@ def similarity(a: np.ndarray, b: np.ndarray) -> float:
     return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
 
 
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Rows scaled to unit length (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def similarities(vectors: np.ndarray, targets: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of `vectors` (n x d) with every row of
+    `targets` (k x d, or one d-vector): an n x k matrix (or n-vector) from
+    one normalized matrix product."""
+    return normalize(vectors) @ normalize(targets).T
+
+
+def length_batches(texts: Sequence[str], batch_size: int = 64, batch_tokens: int = BATCH_TOKENS) -> list[list[int]]:
+    """Indices of `texts` in batches of similar length, longest first. A
+    batch pads to its first (longest) text, so it is cut at `batch_size`
+    texts or when padding would pass `batch_tokens` (~4 characters a token,
+    at most 512 tokens a text): long texts go in small batches, short ones in
+    full ones."""
+    def tokens(i):
+        return min(512, len(texts[i]) // 4 + 2)
+
+    batches, batch = [], []
+    for i in sorted(range(len(texts)), key=lambda i: len(texts[i]), reverse=True):
+        if batch and (len(batch) >= batch_size or (len(batch) + 1) * tokens(batch[0]) > batch_tokens):
+            batches.append(batch)
+            batch = []
+        batch.append(i)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def encode(texts: Sequence[str], batch_size: int = 64, model=None) -> np.ndarray:
+    """len(texts) x d float32 embeddings, encoded in length buckets."""
+    model = model or get_model()
+    out = None
+    for batch in length_batches(texts, batch_size):
+        vecs = model.encode([texts[i] for i in batch], batch_size=len(batch),
+                            convert_to_numpy=True, show_progress_bar=False)
+        if out is None:
+            out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+        out[batch] = vecs
+    return out if out is not None else np.empty((0, 0), dtype=np.float32)
+
+
 def embed_batch(
     titles: Sequence[str],
     texts: Sequence[str],
-    batch_size: int = 24,
+    batch_size: int = 64,
 ) -> np.ndarray:
     assert len(titles) == len(texts), "titles and texts must align"
 
-    # work out which titles we have not embedded yet
-    missing_idx = [i for i, t in enumerate(titles) if t not in _EMB_CACHE]
+    # work out which titles we have not embedded yet (once per title)
+    store = get_store()
+    missing_idx = list({t: i for i, t in enumerate(titles) if t not in store}.values())
 
     if missing_idx:
-        to_encode = [texts[i] for i in missing_idx]
-        new_vecs = MODEL.encode(
-            to_encode,
-            batch_size=batch_size,
-            convert_to_numpy=True,
-            show_progress_bar=False,
-        )
-        for i, vec in zip(missing_idx, new_vecs):
-            _EMB_CACHE[titles[i]] = vec
-
-    return np.stack([_EMB_CACHE[t] for t in titles])
-
-
-
-
-def main():
-    # read the JSON file
-    with open("wikipedia_final_data.json", "r") as f:
-        graph = json.load(f)
-
-    doc_dict = {"doc":[], "doc_embedding":[]}
-    subdoc_dict = {"doc": [], "subdoc":[], "subdoc_embedding":[]}
-
-    sbert_model = SentenceTransformer('bert-base-nli-mean-tokens')
-
-    # iterate over each of the main documents
-    for doc in graph:
-        # calculate the embedding of the main documents
-        doc_dict["doc"].append(graph[doc]["title"])
-        doc_dict["doc_embedding"].append(
-            embed_batch([graph[doc]["first_paragraph"]])[0]
-        )
-        subtexts, subhandles = [], []
-        for t in ["linked_pages", "what_links_here"]:
-            for subdoc in graph[doc][t]:
-                subhandles.append(subdoc)  # keep handle for later
-                subtexts.append(subdoc["first_paragraph"])
-
-        for subdoc, emb in zip(subhandles, embed_batch(subtexts)):
-            subdoc_dict["doc"].append(graph[doc]["title"])
-            subdoc_dict["subdoc"].append(subdoc)
-            subdoc_dict["subdoc_embedding"].append(emb)
-
-    subdoc_df = pd.DataFrame(subdoc_dict)
-    subdoc_df = subdoc_df.convert_dtypes()
-    subdoc_df["subdoc_embeddings"] = subdoc_df["subdoc_embedding"].to_numpy()
-    doc_df = pd.DataFrame(doc_dict)
-    doc_df = doc_df.convert_dtypes()
-    doc_df["doc_embeddings"] = doc_df["doc_embedding"].to_numpy()
-
-    # compare
-    doc_emb = dict(zip(doc_df["doc"], doc_df["doc_embeddings"]))
-
-    # assign score to each of the documents
-    subdoc_df["doc_similarity"] = subdoc_df.apply(
-        lambda row: similarity(doc_emb[row["doc"]], row["subdoc_embeddings"]),
-        axis=1
-    )
-
-    plt.hist(subdoc_df["doc_similarity"], bins=50)
-    plt.xlabel("Cosine similarity")
-    plt.ylabel("Frequency")
-    plt.title("Histogram of document–subdocument similarities")
-    # plt.show()
+        new_vecs = encode([texts[i] for i in missing_idx], batch_size)
+        store.add_many([titles[i] for i in missing_idx], new_vecs)
+
+    return store.get_many(list(titles))
 
-    threshold = 0.7
 
-    mask = subdoc_df["doc_similarity"] >= threshold
-    keep  = subdoc_df.loc[mask, ["doc", "subdoc"]]
 
-    # allowed = keep.groupby("doc")["subdoc"]#.apply(set)
-    allowed = keep.groupby("doc").apply(set)
-    print(allowed.columns)
 
-    # set threshold or rank all of the documents and filter them out or something
-    for doc in graph:
-        for t in ("linked_pages", "what_links_here"):
-            graph[doc][t] = [s for s in graph[doc][t]
-                                if s in allowed.get(graph[doc]["title"], set())]
+SCORE_CHUNK = 4096    # sub-documents embedded and scored per step
+HIST_BINS = 50
+READ_CHUNK = 1 << 16  # characters read from the input per refill
+
+_WS = " \t\n\r"
+_DELIMITERS = ",:]}" + _WS  # what may follow a complete JSON value
+
+
+def iter_json_object(path: str, chunk_size: int = READ_CHUNK):
+    """Yield the (key, value) pairs of the top-level JSON object in `path`
+    one by one, without reading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def skip_ws():
+            nonlocal buf, pos, eof
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return
+                more = f.read(chunk_size)
+                buf, pos, eof = buf[pos:] + more, 0, not more
+
+        def decode():
+            # grow the buffer until one whole value decodes; a value not
+            # followed by a delimiter may still be truncated (a number cut at
+            # "1." or "12e" decodes as a shorter number)
+            nonlocal buf, pos, eof
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    if eof or (end < len(buf) and buf[end] in _DELIMITERS):
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                more = f.read(max(chunk_size, len(buf)))
+                buf, pos, eof = buf[pos:] + more, 0, not more
+
+        def expect(char):
+            nonlocal pos
+            skip_ws()
+            if buf[pos:pos + 1] != char:
+                raise ValueError(f"{path}: expected {char!r}")
+            pos += 1
+
+        expect("{")
+        skip_ws()
+        if buf[pos:pos + 1] == "}":
+            return
+        while True:
+            skip_ws()
+            key = decode()
+            expect(":")
+            skip_ws()
+            yield key, decode()
+            skip_ws()
+            if buf[pos:pos + 1] == "}":
+                return
+            expect(",")
+
+
+def _write_doc(out, key, doc, first):
+    body = json.dumps(doc, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+    out.write(("" if first else ",\n") + "  " + json.dumps(key, ensure_ascii=False) + ": " + body)
+
+
+def main(path="wikipedia_final_data.json", out_path="wikipedia_filtered.json",
+         hist_path="similarity_hist.png", threshold=0.7, chunk=SCORE_CHUNK):
+    """Score every linked page / backlink against the document it hangs off
+    and keep those with cosine similarity >= `threshold`.
+
+    Documents are streamed from `path` (iter_json_object) and taken in
+    groups of about `chunk` sub-documents. A group's documents and
+    sub-documents are embedded, scored with one row-wise product of
+    normalized matrices, added to a fixed-bin histogram and written to
+    `out_path` before the next group is read, so memory is bounded by the
+    chunk (and the largest single document), not by the file."""
+    import matplotlib.pyplot as plt
+
+    edges = np.linspace(-1, 1, HIST_BINS + 1)
+    counts = np.zeros(HIST_BINS, dtype=np.int64)
+    n_docs = n_scored = n_kept = 0
+
+    with open(out_path + ".tmp", "w", encoding="utf-8") as out:
+        out.write("{\n")
+
+        def flush(group):
+            # embed and score one group of (key, doc), then write it out
+            nonlocal n_docs, n_scored, n_kept
+            docs = [doc for _, doc in group]
+            doc_vecs = normalize(embed_batch([d["title"] for d in docs], [d["first_paragraph"] for d in docs]))
+            subs = [(d, kind, sub) for d, doc in enumerate(docs)
+                    for kind in ("linked_pages", "what_links_here") for sub in doc[kind]]
+            kept = [{"linked_pages": [], "what_links_here": []} for _ in docs]
+            if subs:
+                vecs = normalize(embed_batch([sub["title"] for _, _, sub in subs],
+                                             [sub["first_paragraph"] for _, _, sub in subs]))
+                owners = np.array([d for d, _, _ in subs])
+                scores = np.einsum("ij,ij->i", vecs, doc_vecs[owners])
+                counts[:] += np.histogram(np.clip(scores, -1, 1), bins=edges)[0]
+                for (d, kind, sub), score in zip(subs, scores):
+                    if score >= threshold:
+                        kept[d][kind].append(sub)
+                        n_kept += 1
+                n_scored += len(subs)
+            for (key, doc), k in zip(group, kept):
+                _write_doc(out, key, dict(doc, **k), n_docs == 0)
+                n_docs += 1
+
+        group, size = [], 0
+        for key, doc in iter_json_object(path):
+            group.append((key, doc))
+            size += len(doc["linked_pages"]) + len(doc["what_links_here"])
+            if size >= chunk or len(group) >= chunk:
+                flush(group)
+                group, size = [], 0
+        if group:
+            flush(group)
+        out.write("\n}\n")
+    os.replace(out_path + ".tmp", out_path)
+
+    plt.stairs(counts, edges, fill=True)
+    plt.xlabel("Cosine similarity")
+    plt.ylabel("Frequency")
+    plt.title("Histogram of document–subdocument similarities")
+    plt.savefig(hist_path)
+    # plt.show()
 
-    # write the filtered graph
-    with open("wikipedia_filtered.json", "w") as f:
-        json.dump(graph, f, ensure_ascii=False, indent=2)
+    print(f"Kept {n_kept} of {n_scored} sub-documents (threshold {threshold}); "
+          f"wrote {out_path} and {hist_path}")
+    return counts, edges
 
 if __name__ == "__main__":
     main()
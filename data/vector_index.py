@@ -0,0 +1,236 @@
+"""Nearest-neighbour index over the embedding store.
+
+``VectorIndex`` answers cosine top-k and range queries against every title
+in an ``EmbeddingStore`` (embedding_store.py), so "which crawled pages are
+close to any election topic" is one query over all cached pages rather than
+a per-page comparison with the page they were found from:
+
+    exact   the store's memory map is scanned in blocks of `block` rows;
+            each block is normalized and scored against all queries with
+            one matrix product, so memory stays bounded by the block
+    ivf     an inverted file: spherical k-means centroids split the rows
+            into `nlist` lists, and a query only scans the rows of its
+            `nprobe` nearest lists (approximate; more probes, more recall);
+            rows are kept grouped by list, so finding them costs nothing
+            per row of the other lists
+
+The index follows the store: titles appended since the last query are
+picked up first, and in ivf mode assigned to their nearest centroid. The
+centroids and list assignment persist as ``ivf.npz`` in the store
+directory, so only rows added since the last save are assigned on reopen.
+
+    python vector_index.py --targets --threshold 0.8        # pages near any TARGET_PAGES
+    python vector_index.py --text "mail-in ballots" --k 20
+    python vector_index.py --build-ivf 256 --targets --k 50 --approx
+"""
+import os
+import argparse
+import numpy as np
+
+from embedding_store import EmbeddingStore
+
+BLOCK = 65_536
+NPROBE = 8
+KMEANS_ITERS = 10
+KMEANS_SAMPLE = 256  # training rows per list
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class VectorIndex:
+    def __init__(self, store, block=BLOCK, nprobe=NPROBE):
+        self.store = store
+        self.block = block
+        self.nprobe = nprobe
+        self.titles = []
+        self.rows = np.empty(0, dtype=np.int64)
+        self.centroids = None
+        self.lists = np.empty(0, dtype=np.int32)  # list of each indexed row, ivf only
+        self.list_ptr = None                       # list id -> its range of list_positions
+        self.list_positions = None                 # positions grouped by list, ascending
+        self._load_ivf()
+        self.refresh()
+
+    def _ivf_path(self):
+        return os.path.join(self.store.path, "ivf.npz")
+
+    def _load_ivf(self):
+        try:
+            data = np.load(self._ivf_path())
+        except FileNotFoundError:
+            return
+        self.centroids, self.lists = data["centroids"], data["lists"]
+        self._index_lists()
+
+    def save_ivf(self):
+        tmp = self._ivf_path() + ".tmp.npz"
+        np.savez(tmp, centroids=self.centroids, lists=self.lists)
+        os.replace(tmp, self._ivf_path())
+
+    def refresh(self):
+        """Index the titles appended to the store since the last call;
+        returns how many there were."""
+        new = self.store.entries(len(self.titles))
+        if new:
+            self.titles.extend(t for t, _ in new)
+            self.rows = np.concatenate([self.rows, np.array([r for _, r in new], dtype=np.int64)])
+        if self.centroids is not None and len(self.lists) < len(self.rows):
+            start = len(self.lists)
+            self.lists = np.concatenate([self.lists, self._assign(self.rows[start:])])
+            self._index_lists()
+            self.save_ivf()
+        return len(new)
+
+    def __len__(self):
+        return len(self.titles)
+
+    # -- ivf --
+
+    def _index_lists(self):
+        # CSR over list ids, so a query reads only the rows of its lists
+        self.list_positions = np.argsort(self.lists, kind="stable")
+        self.list_ptr = np.zeros(len(self.centroids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.lists, minlength=len(self.centroids)), out=self.list_ptr[1:])
+
+    def _assign(self, rows):
+        vectors = self.store.vectors()
+        out = np.empty(len(rows), dtype=np.int32)
+        for s in range(0, len(rows), self.block):
+            out[s:s + self.block] = np.argmax(_normalize(vectors[rows[s:s + self.block]]) @ self.centroids.T, axis=1)
+        return out
+
+    def build_ivf(self, nlist, iters=KMEANS_ITERS, seed=0):
+        """Train `nlist` spherical k-means centroids on a sample of the rows
+        and assign every row to its nearest one."""
+        self.refresh()
+        rng = np.random.default_rng(seed)
+        nlist = min(nlist, len(self.rows))
+        sample = rng.choice(len(self.rows), min(len(self.rows), nlist * KMEANS_SAMPLE), replace=False)
+        train = _normalize(self.store.vectors()[np.sort(self.rows[sample])])
+        centroids = train[rng.choice(len(train), nlist, replace=False)]
+        for _ in range(iters):
+            nearest = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, train)
+            empty = np.bincount(nearest, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        self.centroids = centroids
+        self.lists = self._assign(self.rows)
+        self._index_lists()
+        self.save_ivf()
+
+    # -- queries --
+
+    def _candidates(self, queries, approx):
+        """Per query, the positions (into self.titles) it has to scan, or
+        None for all of them."""
+        if not approx:
+            return [None] * len(queries)
+        if self.centroids is None:
+            raise ValueError("approximate search needs build_ivf() first")
+        probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :self.nprobe]
+        return [np.sort(np.concatenate([self.list_positions[self.list_ptr[l]:self.list_ptr[l + 1]] for l in p]))
+                for p in probes]
+
+    def _groups(self, queries, approx):
+        """(query indices, positions) to scan together: all queries over all
+        rows, or, since queries probing different lists scan different rows,
+        one query at a time over its candidates in ivf mode."""
+        if not approx:
+            return [(np.arange(len(queries)), None)]
+        return [(np.array([i]), c) for i, c in enumerate(self._candidates(queries, approx))]
+
+    def _scan(self, queries, positions):
+        """(positions, scores) blocks of `queries` against the given rows."""
+        vectors = self.store.vectors()
+        n = len(self.rows) if positions is None else len(positions)
+        for s in range(0, n, self.block):
+            pos = np.arange(s, min(n, s + self.block)) if positions is None else positions[s:s + self.block]
+            yield pos, queries @ _normalize(vectors[self.rows[pos]]).T
+
+    def search(self, queries, k=10, approx=False):
+        """For every query vector, the k most similar [(title, cosine)], best first."""
+        self.refresh()
+        queries = _normalize(np.atleast_2d(queries))
+        out = [None] * len(queries)
+        for qi, positions in self._groups(queries, approx):
+            best_pos = np.empty((len(qi), 0), dtype=np.int64)
+            best = np.empty((len(qi), 0), dtype=np.float32)
+            for pos, scores in self._scan(queries[qi], positions):
+                best_pos = np.hstack([best_pos, np.broadcast_to(pos, scores.shape)])
+                best = np.hstack([best, scores])
+                if best.shape[1] > k:
+                    keep = np.argpartition(-best, k, axis=1)[:, :k]
+                    best_pos = np.take_along_axis(best_pos, keep, axis=1)
+                    best = np.take_along_axis(best, keep, axis=1)
+            order = np.argsort(-best, axis=1)
+            for j, q in enumerate(qi):
+                out[q] = [(self.titles[best_pos[j, o]], float(best[j, o])) for o in order[j]]
+        return out
+
+    def range_search(self, queries, threshold, approx=False):
+        """For every query vector, every [(title, cosine)] with cosine >=
+        `threshold`, best first."""
+        self.refresh()
+        queries = _normalize(np.atleast_2d(queries))
+        hits = [[] for _ in queries]
+        for qi, positions in self._groups(queries, approx):
+            for pos, scores in self._scan(queries[qi], positions):
+                for j, col in zip(*np.nonzero(scores >= threshold)):
+                    hits[qi[j]].append((int(pos[col]), float(scores[j, col])))
+        return [[(self.titles[p], s) for p, s in sorted(h, key=lambda h: -h[1])] for h in hits]
+
+    def near_any(self, queries, threshold, approx=False):
+        """{title: best cosine} of every title within `threshold` of at least
+        one of the queries (e.g. all TARGET_PAGES)."""
+        best = {}
+        for hits in self.range_search(queries, threshold, approx):
+            for title, score in hits:
+                if score > best.get(title, -1.0):
+                    best[title] = score
+        return dict(sorted(best.items(), key=lambda kv: -kv[1]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", default="embeddings", help="embedding store directory")
+    parser.add_argument("--targets", action="store_true", help="query with the TARGET_PAGES embeddings")
+    parser.add_argument("--text", action="append", default=[], help="query text (repeatable)")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--threshold", type=float, default=None, help="range query instead of top-k")
+    parser.add_argument("--approx", action="store_true", help="ivf search")
+    parser.add_argument("--nprobe", type=int, default=NPROBE)
+    parser.add_argument("--build-ivf", type=int, metavar="NLIST", help="(re)train the ivf lists first")
+    args = parser.parse_args()
+
+    index = VectorIndex(EmbeddingStore(args.store), nprobe=args.nprobe)
+    if args.build_ivf:
+        index.build_ivf(args.build_ivf)
+    names, queries = [], []
+    if args.targets:
+        from collector import TARGET_PAGES
+        names += [t for t in TARGET_PAGES if t in index.store]
+        queries.append(index.store.get_many(names))
+    if args.text:
+        from relevance import encode
+        names += args.text
+        queries.append(encode(args.text))
+    if not names:
+        parser.error("nothing to query: give --targets and/or --text")
+    queries = np.vstack(queries)
+
+    if args.threshold is not None:
+        hits = index.near_any(queries, args.threshold, args.approx)
+        print(f"{len(hits)} of {len(index)} pages within {args.threshold} of any query")
+        for title, score in hits.items():
+            print(f"{score:.3f}  {title}")
+    else:
+        for name, hits in zip(names, index.search(queries, args.k, args.approx)):
+            print(f"\n{name}")
+            for title, score in hits:
+                print(f"   {score:.3f}  {title}")
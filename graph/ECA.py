@@ -1,11 +1,37 @@
 import networkx as nx
+from collections import Counter
 
-def extract_cliques_from_explicit(graph, min_size=3):
-    G = nx.Graph(graph)
-    cliques = list(nx.find_cliques(G))
-    return [set(c) for c in cliques if len(c) >= min_size]
+from graph.cliques import maximal_cliques
+from graph.csr import CSRGraph
+from graph.metrics import counters, note
+
+def _cliques(graph, min_size=3, time_budget=None, max_cliques=None):
+    # (cliques, exact); see graph/cliques.py for the pruning and the budget
+    if isinstance(graph, CSRGraph):
+        nodes = [graph.titles[t] for t in graph.node_ids.tolist()]
+        adj = [set(graph.neighbors(i).tolist()) for i in range(len(nodes))]
+    else:
+        nodes = list(graph)
+        for nbrs in graph.values():
+            nodes.extend(n for n in nbrs if n not in graph)
+        local = {e: i for i, e in enumerate(nodes)}
+        adj = [{local[n] for n in graph.get(e, ())} for e in nodes]
+        for i, e in enumerate(nodes):  # neighbours missing as keys
+            for j in adj[i]:
+                adj[j].add(i)
+    cliques, exact = maximal_cliques(adj, min_size, time_budget, max_cliques)
+    # enumeration order follows node numbering; ECA keeps the first matching
+    # cluster, so hand it the cliques in an order fixed by their titles alone
+    cliques = sorted(sorted(nodes[i] for i in c) for c in cliques)
+    return [set(c) for c in cliques], exact
+
+def extract_cliques_from_explicit(graph, min_size=3, time_budget=None, max_cliques=None):
+    return _cliques(graph, min_size, time_budget, max_cliques)[0]
 
 def extract_components_from_implicit(graph, min_size=3):
+    # CSRGraphs (graph/csr.py) are split with a union-find, no networkx copy
+    if isinstance(graph, CSRGraph):
+        return [graph.node_titles(c) for c in graph.components(min_size)]
     G = nx.Graph(graph)
     components = list(nx.connected_components(G))
     return [set(c) for c in components if len(c) >= min_size]
@@ -17,34 +43,56 @@ def jaccard(set1, set2):
 # Entity Cluster Algorithm 
 # -----------------------
 
-def entity_cluster_aggregation(temporal_graphs, strategy='explicit', gamma=0.8):
-    merged_events = []
-    prev_clusters = []
+def entity_cluster_aggregation(temporal_graphs, strategy='explicit', gamma=0.8, state=None, on_step=None,
+                               clique_time_budget=None, clique_max=None):
+    # state: (merged_events, prev_clusters) from an earlier run, to continue
+    # it with later timesteps; on_step(time, merged_events, prev_clusters) is
+    # called after every timestep (see graph/incremental.py). A day whose
+    # cliques exceed clique_time_budget seconds or clique_max cliques gets an
+    # approximate clique cover, recorded with metrics.note.
+    merged_events, prev_clusters = state if state else ([], [])
+    n_clusters = comparisons = full_scan = 0
 
     for time, graph in sorted(temporal_graphs.items()):
         if strategy == 'explicit':
-            clusters = extract_cliques_from_explicit(graph)
+            clusters, exact = _cliques(graph, time_budget=clique_time_budget, max_cliques=clique_max)
+            if not exact:
+                counters["clique_days_approximated"] += 1
+                note("clique_budget_exceeded", day=time, nodes=len(graph), cliques=len(clusters))
         else:
             clusters = extract_components_from_implicit(graph)
+        n_clusters += len(clusters)
+        full_scan += len(clusters) * len(prev_clusters)
+
+        # entity -> open clusters containing it (explicit), or the first open
+        # cluster containing it (implicit); kept current as clusters grow
+        index = {}
+        for i, prev in enumerate(prev_clusters):
+            for e in prev['entities']:
+                if strategy == 'explicit':
+                    index.setdefault(e, []).append(i)
+                else:
+                    index.setdefault(e, i)
 
         new_clusters = []
         for c in clusters:
-            merged = False
-            for prev in prev_clusters:
-                if strategy == 'explicit':
-                    sim = jaccard(prev['entities'], c)
-                    if sim >= gamma:
-                        prev['entities'].update(c)
-                        prev['end'] = time
-                        merged = True
-                        break
-                else:  # implicit: share at least one entity
-                    if prev['entities'] & c:
-                        prev['entities'].update(c)
-                        prev['end'] = time
-                        merged = True
-                        break
-            if not merged:
+            if strategy == 'explicit':
+                match, compared = _first_jaccard_match(c, prev_clusters, index, gamma)
+            else:  # implicit: share at least one entity
+                hits = [index[e] for e in c if e in index]
+                match, compared = min(hits, default=None), len(set(hits))
+            comparisons += compared
+
+            if match is not None:
+                prev = prev_clusters[match]
+                for e in c - prev['entities']:
+                    if strategy == 'explicit':
+                        index.setdefault(e, []).append(match)
+                    elif index.get(e, match) >= match:
+                        index[e] = match
+                prev['entities'].update(c)
+                prev['end'] = time
+            else:
                 new_cluster = {
                     'entities': set(c),
                     'start': time,
@@ -53,4 +101,23 @@ def entity_cluster_aggregation(temporal_graphs, strategy='explicit', gamma=0.8):
                 merged_events.append(new_cluster)
                 new_clusters.append(new_cluster)
         prev_clusters = new_clusters  # only try to merge forward
+        if on_step:
+            on_step(time, merged_events, prev_clusters)
+    counters.update(eca_clusters=n_clusters, eca_cluster_comparisons=comparisons,
+                    eca_full_scan_comparisons=full_scan)
     return merged_events
+
+def _first_jaccard_match(c, prev_clusters, index, gamma):
+    """(index of the first open cluster with jaccard(prev, c) >= gamma, or
+    None; number of open clusters compared)."""
+    overlap = Counter(i for e in c for i in index.get(e, ()))
+    # a cluster sharing no entity has jaccard 0, so only gamma <= 0 needs them
+    candidates = sorted(overlap) if gamma > 0 else range(len(prev_clusters))
+    for k, i in enumerate(candidates, 1):
+        n_prev, n_c = len(prev_clusters[i]['entities']), len(c)
+        if min(n_prev, n_c) / max(n_prev, n_c) < gamma:  # jaccard <= size ratio
+            continue
+        inter = overlap[i]
+        if inter / (n_prev + n_c - inter) >= gamma:
+            return i, k
+    return None, len(candidates)
@@ -0,0 +1,176 @@
+"""Scaling benchmark of the pipeline stages on synthetic datasets.
+
+For every point of a sweep a dataset is generated (graph/synthetic.py), then
+each stage is run once and timed with its peak memory and hot-path counters
+(graph/metrics.py):
+
+    build_all_edits             compile the edit store from the JSON files
+    detect_bursts               batch burst detection
+    build_explicit_graph        every day's explicit graph
+    build_implicit_graph        every day's implicit graph
+    entity_cluster_aggregation  ECA over the explicit, then the implicit graphs
+
+Every point is appended as one JSON line to the results file with the git
+commit, host and generator parameters, so runs can be compared over time:
+
+    python -m graph.benchmark --sweep n_entities=250,500,1000,2000
+    python -m graph.benchmark --sweep vocab_size=1000,10000 --set n_entities=1000
+    python -m graph.benchmark --compare
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime, timezone
+
+from graph.build_graphs import build_all_edits
+from graph.bursts import detect_bursts_batch
+from graph.ECA import entity_cluster_aggregation
+from graph.metrics import Stages
+from graph.synthetic import DEFAULTS, generate_dataset
+from graph.temporal import build_temporal_graphs
+
+RESULTS = "benchmarks/results.jsonl"
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _recovered(planted, events):
+    """Planted events whose entities all fall in one detected event."""
+    return sum(any(set(p["entities"]) <= e["entities"] for e in events) for p in planted)
+
+def run_point(params, workers=1, delta_days=2, burst_percentile=90, similarity_threshold=0.3, gamma=0.8):
+    """Generate one dataset and benchmark every stage on it; returns the record."""
+    tmp = tempfile.mkdtemp(prefix="benchmark_")
+    try:
+        data_dir = os.path.join(tmp, "data")
+        t = time.perf_counter()
+        planted = generate_dataset(data_dir, **params)
+        generate_seconds = time.perf_counter() - t
+        input_mb = sum(os.path.getsize(os.path.join(data_dir, f)) for f in os.listdir(data_dir)) / 2 ** 20
+
+        stages = Stages()
+        with stages.stage("build_all_edits", input_mb=round(input_mb, 1)) as s:
+            store = build_all_edits(data_dir, workers=workers)
+            s["items"] = len(store)
+        with stages.stage("detect_bursts") as s:
+            burst_map = detect_bursts_batch(store, burst_percentile)
+            s["items"] = len(store)
+
+        graphs, events = {}, {}
+        for mode in ("explicit", "implicit"):
+            with stages.stage(f"build_{mode}_graph") as s:
+                graphs[mode], _ = build_temporal_graphs(store, mode, burst_map if mode == "implicit" else None,
+                                                        delta_days=delta_days,
+                                                        similarity_threshold=similarity_threshold,
+                                                        workers=workers)
+                s["items"] = len(store)
+        for mode in ("explicit", "implicit"):
+            with stages.stage("entity_cluster_aggregation", mode=mode) as s:
+                events[mode] = entity_cluster_aggregation(graphs[mode], strategy=mode, gamma=gamma)
+                s["items"] = len(graphs[mode])
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    for s in stages.stages:
+        s["throughput"] = s["items"] / s["seconds"] if s["seconds"] else None
+    return {
+        "params": {**DEFAULTS, **params},
+        "workers": workers,
+        "generate_seconds": generate_seconds,
+        "edits": len(store),
+        "stages": stages.to_list(),
+        "events": {mode: len(ev) for mode, ev in events.items()},
+        "planted_recovered": {mode: _recovered(planted, ev) for mode, ev in events.items()},
+    }
+
+def run_sweep(sweep, base=None, workers=1, results=RESULTS):
+    """Benchmark `base` with each (parameter, values) of `sweep` varied in turn,
+    appending every point to `results`; returns the records."""
+    run = {"run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+           "commit": _git_commit(),
+           "host": {"platform": platform.platform(), "python": sys.version.split()[0],
+                    "cpu_count": os.cpu_count()}}
+    records = []
+    if results:
+        os.makedirs(os.path.dirname(results) or ".", exist_ok=True)
+    for key, values in sweep:
+        for value in values:
+            record = {**run, "sweep": key, **run_point({**(base or {}), key: value}, workers)}
+            records.append(record)
+            print(format_record(record))
+            if results:
+                with open(results, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+    return records
+
+
+# -----------------------
+# Reporting
+# -----------------------
+
+def _stage_label(s):
+    return s["name"] + (f"[{s['mode']}]" if "mode" in s else "")
+
+def format_record(record):
+    key = record["sweep"]
+    lines = [f"{key}={record['params'][key]} ({record['edits']} edits)"]
+    for s in record["stages"]:
+        rate = f"{s['throughput']:>12,.0f}/s" if s["throughput"] else " " * 14
+        lines.append(f"   {_stage_label(s):<40} {s['seconds']:8.3f}s {rate} {s['peak_rss_mb']:8.1f} MB")
+    return "\n".join(lines)
+
+def compare(results=RESULTS):
+    """Stage times of the latest run against the previous run with the same
+    parameters, for every parameter set in `results`."""
+    by_params = {}
+    with open(results, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            by_params.setdefault(json.dumps([record["params"], record["workers"]], sort_keys=True), []).append(record)
+
+    for runs in by_params.values():
+        latest = runs[-1]
+        print(f"{latest['sweep']}={latest['params'][latest['sweep']]} "
+              f"@ {latest['commit']} ({latest['run_at']}), {len(runs)} runs")
+        previous = {_stage_label(s): s for s in runs[-2]["stages"]} if len(runs) > 1 else {}
+        for s in latest["stages"]:
+            old = previous.get(_stage_label(s))
+            change = f"{s['seconds'] / old['seconds']:6.2f}x vs {runs[-2]['commit']}" if old and old["seconds"] else ""
+            print(f"   {_stage_label(s):<40} {s['seconds']:8.3f}s {change}")
+
+
+def _sweep_arg(text):
+    key, _, values = text.partition("=")
+    if key not in DEFAULTS:
+        raise argparse.ArgumentTypeError(f"unknown generator parameter: {key}")
+    kind = type(DEFAULTS[key])
+    return key, [kind(v) for v in values.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sweep", type=_sweep_arg, action="append",
+                        help="parameter=v1,v2,... (repeatable; default n_entities=250,500,1000,2000)")
+    parser.add_argument("--set", type=_sweep_arg, action="append", default=[],
+                        help="parameter=value held fixed for every point")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--results", default=RESULTS)
+    parser.add_argument("--compare", action="store_true", help="compare the saved runs instead")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.results)
+    else:
+        base = {key: values[0] for key, values in args.set}
+        run_sweep(args.sweep or [("n_entities", [250, 500, 1000, 2000])], base, args.workers, args.results)
@@ -1,9 +1,11 @@
 import os
-import json
 import re
 import numpy as np
 from collections import defaultdict, Counter
 from datetime import datetime
+from bisect import bisect_left, bisect_right
+
+from graph.metrics import counters
 
 DATA_DIR = '../data/edits/' 
 DELTA_DAYS = 2
@@ -15,28 +17,36 @@ WIKI_LINK_RE = re.compile(r'\[\[(.*?)\]\]')
 # Helpers
 # -----------------------
 
+def extract_links(added):
+    links = WIKI_LINK_RE.findall(' '.join(added))
+    return {l.split('|')[0].strip() for l in links}
+
 def parse_entity_links(json_path):
-    with open(json_path, 'r') as f:
-        edits = json.load(f)
+    from graph.ingest import iter_json_array
+    edits = iter_json_array(json_path)
 
     entity = os.path.splitext(os.path.basename(json_path))[0][6:]
     results = []
 
     for edit in edits:
         ts = datetime.fromisoformat(edit["timestamp"].replace("Z", "+00:00"))
-        added_text = ' '.join(edit.get("added", []))
-        links = WIKI_LINK_RE.findall(added_text)
-        clean_links = [l.split('|')[0].strip() for l in links]
         results.append({
             "entity": entity,
             "timestamp": ts,
             "added": edit.get("added", []),
-            "links_added": set(clean_links)
+            "links_added": extract_links(edit.get("added", []))
         })
 
     return results
 
-def build_all_edits(data_dir):
+def build_all_edits(data_dir, use_store=True, workers=None):
+    # The compiled store (graph/edit_store.py) is rebuilt only when the
+    # edits_*.json files change, parsing them across `workers` processes
+    # (graph/ingest.py); otherwise it is memory-mapped as-is.
+    if use_store:
+        from graph.edit_store import open_edit_store
+        return open_edit_store(data_dir, workers=workers)
+
     all_edits = []
     for fname in os.listdir(data_dir):
         if fname.endswith(".json"):
@@ -48,27 +58,81 @@ def build_all_edits(data_dir):
 # Explicit Graph
 # -----------------------
 
-def build_explicit_graph(all_edits, delta_days=2):
-    graph = defaultdict(set)
-    links_by_entity = defaultdict(list)
-
+def _reciprocal_matches(all_edits, delta_days):
+    """Yield (e1, e2, matches) for every pair of entities, e1 <= e2, where
+    e1 added a link to e2 and e2 one to e1. `matches` lazily yields (ts1,
+    back, lo, hi) for each time ts1 e1 added the link that has a reverse
+    link back[lo:hi] less than delta_days + 1 days away (the window
+    `abs((ts2 - ts1).days) <= delta_days` covers once it is checked from
+    both sides)."""
+    window = (delta_days + 1) * 86400
+    # (entity, linked title) -> sorted timestamps of the entity's edits adding that link
+    linked_at = defaultdict(list)
     for edit in all_edits:
-        links_by_entity[edit["entity"]].append(edit)
-
-    for edits in links_by_entity.values():
-        edits.sort(key=lambda x: x["timestamp"])
-
-    for e1, e1_edits in links_by_entity.items():
-        for e1_edit in e1_edits:
-            ts1 = e1_edit["timestamp"]
-            for e2 in e1_edit["links_added"]:
-                if e2 not in links_by_entity:
-                    continue
-                for e2_edit in links_by_entity[e2]:
-                    ts2 = e2_edit["timestamp"]
-                    if abs((ts2 - ts1).days) <= delta_days and e1 in e2_edit["links_added"]:
-                        graph[e1].add(e2)
-                        graph[e2].add(e1)
+        ts = edit["timestamp"].timestamp()
+        for linked in edit["links_added"]:
+            linked_at[edit["entity"], linked].append(ts)
+    for times in linked_at.values():
+        times.sort()
+
+    probes = 0
+
+    def matches(times, back):
+        nonlocal probes
+        for ts1 in times:
+            probes += 1
+            lo = bisect_right(back, ts1 - window)
+            hi = bisect_left(back, ts1 + window, lo)
+            if lo < hi:
+                yield ts1, back, lo, hi
+
+    for (e1, e2), times in linked_at.items():
+        if e1 > e2:
+            continue
+        back = linked_at.get((e2, e1))
+        if back:
+            yield e1, e2, matches(times, back)
+    counters.update(reciprocal_link_keys=len(linked_at), reciprocal_link_probes=probes)
+
+def reciprocal_links(all_edits, delta_days=2):
+    """Yield (e1, e2) for every pair of entities with an edit of e1 linking
+    e2 and an edit of e2 linking e1 less than delta_days + 1 days apart;
+    each pair is yielded once, with e1 <= e2."""
+    for e1, e2, matches in _reciprocal_matches(all_edits, delta_days):
+        if next(matches, None) is not None:  # stop probing at the first match
+            yield e1, e2
+
+def reciprocal_link_weights(all_edits, delta_days=2):
+    """Like reciprocal_links, but yield (e1, e2, count, gap): the
+    number of (e1 -> e2, e2 -> e1) link-edit pairs less than delta_days + 1
+    days apart, and the smallest gap between such a pair in seconds."""
+    for e1, e2, matches in _reciprocal_matches(all_edits, delta_days):
+        count, gap = 0, None
+        for ts1, back, lo, hi in matches:
+            count += hi - lo
+            i = bisect_left(back, ts1, lo, hi)
+            near = min(abs(back[j] - ts1) for j in (i - 1, i) if lo <= j < hi)
+            gap = near if gap is None else min(gap, near)
+        if count:
+            yield e1, e2, count, gap
+
+def build_explicit_graph(all_edits, delta_days=2, weighted=False, intern=None):
+    # weighted: {e1: {e2: (reciprocal link pairs, smallest gap in seconds)}}
+    # instead of {e1: set of neighbours}; intern: an EditStore (anything with
+    # titles / title_ids) to build a CSRGraph over its title table instead
+    if intern is not None and not weighted:
+        from graph.csr import CSRGraph
+        return CSRGraph.from_edges(reciprocal_links(all_edits, delta_days),
+                                   intern.titles, intern.title_ids)
+    if weighted:
+        graph = defaultdict(dict)
+        for e1, e2, count, gap in reciprocal_link_weights(all_edits, delta_days):
+            graph[e1][e2] = graph[e2][e1] = (count, gap)
+        return graph
+    graph = defaultdict(set)
+    for e1, e2 in reciprocal_links(all_edits, delta_days):
+        graph[e1].add(e2)
+        graph[e2].add(e1)
     return graph
 
 # -----------------------
@@ -94,8 +158,41 @@ def jaccard_similarity(set1, set2):
         return 0
     return len(set1 & set2) / len(set1 | set2)
 
-def build_implicit_graph(all_edits, burst_map, similarity_threshold=0.3):
-    graph = defaultdict(set)
+def build_implicit_graph(all_edits, burst_map, similarity_threshold=0.3, engine="index", weighted=False,
+                         intern=None):
+    # weighted: {e1: {e2: max shared-burst-day similarity}} instead of
+    # {e1: set of neighbours}; intern: as in build_explicit_graph
+    checks = counters["implicit_similarity_checks"]
+    graph = _build_implicit_graph(all_edits, burst_map, similarity_threshold, engine)
+    if intern is not None and not weighted:
+        from graph.csr import CSRGraph
+        graph = CSRGraph.from_adjacency(graph, intern.titles, intern.title_ids)
+    elif not weighted:
+        graph = defaultdict(set, {e: set(nbrs) for e, nbrs in graph.items()})
+    # pairs a full scan compares vs. pairs each engine actually scored; the
+    # difference is exact for single-day edit sets, as the pipeline builds them
+    n = len({e['entity'] for e in all_edits})
+    considered = n * (n - 1) // 2
+    checks = counters["implicit_similarity_checks"] - checks
+    counters.update(implicit_pairs_considered=considered,
+                    implicit_pairs_pruned=max(considered - checks, 0),
+                    implicit_edges=sum(len(v) for v in graph.values()) // 2)
+    return graph
+
+def _build_implicit_graph(all_edits, burst_map, similarity_threshold, engine):
+    # "index" joins (entity, burst day) token sets through an inverted index
+    # (graph/implicit_index.py); "pairwise" is the original all-pairs scan.
+    # A non-positive threshold links every pair with a shared burst day,
+    # which only the pairwise scan enumerates.
+    if similarity_threshold > 0 and engine == "index":
+        from graph.implicit_index import build_implicit_graph_indexed
+        return build_implicit_graph_indexed(all_edits, burst_map, similarity_threshold)
+    if engine not in ("index", "pairwise"):
+        raise ValueError(f"Unknown implicit graph engine: {engine}")
+    return build_implicit_graph_pairwise(all_edits, burst_map, similarity_threshold)
+
+def build_implicit_graph_pairwise(all_edits, burst_map, similarity_threshold=0.3):
+    graph = defaultdict(dict)
     edits_by_entity = defaultdict(list)
 
     for e in all_edits:
@@ -103,6 +200,7 @@ def build_implicit_graph(all_edits, burst_map, similarity_threshold=0.3):
 
     entities = list(edits_by_entity.keys())
 
+    checks = 0
     for i, e1 in enumerate(entities):
         for e2 in entities[i+1:]:
             shared_burst_days = burst_map[e1] & burst_map[e2]
@@ -110,6 +208,7 @@ def build_implicit_graph(all_edits, burst_map, similarity_threshold=0.3):
                 continue
 
             max_sim = 0
+            checks += 1
             for day in shared_burst_days:
                 a1 = set()
                 a2 = set()
@@ -124,9 +223,9 @@ def build_implicit_graph(all_edits, burst_map, similarity_threshold=0.3):
                 max_sim = max(max_sim, sim)
 
             if max_sim >= similarity_threshold:
-                graph[e1].add(e2)
-                graph[e2].add(e1)
+                graph[e1][e2] = graph[e2][e1] = max_sim
 
+    counters["implicit_similarity_checks"] += checks
     return graph
 
 
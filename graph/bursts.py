@@ -0,0 +1,123 @@
+"""Batch burst detection over a sparse entity x day count matrix.
+
+``detect_bursts`` (graph/build_graphs.py) counts one entity's edits per day
+and calls ``np.percentile`` on them. ``detect_bursts_batch`` does the same for
+every entity at once: the (entity, day) counts are a COO matrix sorted by
+entity, the per-entity percentile is NumPy's linear interpolation evaluated
+on all rows together, and the burst days come back as one CSR-style array of
+sorted day ordinals per entity.
+"""
+import os
+import json
+import numpy as np
+from collections.abc import Mapping
+from datetime import date
+
+
+def entity_day_counts(entity_ids, day_ordinals):
+    """COO (entity, day, count) for the edit columns, sorted by (entity, day)."""
+    entity_ids = np.asarray(entity_ids, dtype=np.int64)
+    day_ordinals = np.asarray(day_ordinals, dtype=np.int64)
+    keys = (entity_ids << 32) | day_ordinals
+    keys, counts = np.unique(keys, return_counts=True)
+    return keys >> 32, keys & 0xFFFFFFFF, counts
+
+def percentile_thresholds(row_ids, values, q):
+    """np.percentile(values[row_ids == r], q) for every row r, where
+    `row_ids` is sorted; returns (rows, thresholds)."""
+    order = np.lexsort((values, row_ids))
+    rows, starts, sizes = np.unique(row_ids[order], return_index=True, return_counts=True)
+    v = values[order].astype(np.float64)
+
+    h = (sizes - 1) * (q / 100)
+    lo = np.floor(h).astype(np.int64)
+    hi = np.minimum(lo + 1, sizes - 1)
+    t = h - lo
+    a, b = v[starts + lo], v[starts + hi]
+    # same two-sided lerp as NumPy, so thresholds match np.percentile bit for bit
+    thresholds = np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
+    return rows, thresholds
+
+def detect_bursts_batch(store, threshold_percentile=90, entities=None, thresholds=None):
+    """BurstMap for every entity with edits in an EditStore, or only for the
+    given entity titles. `thresholds(title)` replaces the exact percentile,
+    e.g. with a sketched one (graph/quantile.py)."""
+    entity_ids, day_ordinals = store.entity, store.day
+    if entities is not None:
+        ids = [store.title_ids[e] for e in entities if e in store.title_ids]
+        mask = np.isin(entity_ids, ids)
+        entity_ids, day_ordinals = entity_ids[mask], day_ordinals[mask]
+    ents, days, counts = entity_day_counts(entity_ids, day_ordinals)
+    if thresholds is None:
+        rows, row_thresholds = percentile_thresholds(ents, counts, threshold_percentile)
+    else:
+        rows = np.unique(ents)
+        row_thresholds = np.array([thresholds(store.titles[e]) for e in rows], dtype=np.float64)
+
+    row_of = np.searchsorted(rows, ents)
+    burst = counts >= row_thresholds[row_of]
+    offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_of[burst], minlength=len(rows)), out=offsets[1:])
+    return BurstMap([store.titles[e] for e in rows], offsets, days[burst].astype(np.int32))
+
+
+class BurstMap(Mapping):
+    """entity title -> set of burst dates, backed by sorted day-ordinal arrays.
+
+    Drop-in for the ``{entity: detect_bursts(...)}`` dict; ``days(entity)`` and
+    ``shared_days(e1, e2)`` work on the ordinal arrays directly.
+    """
+
+    def __init__(self, entities, offsets, day_ordinals):
+        self.entities = list(entities)
+        self.offsets = offsets
+        self.day_ordinals = day_ordinals
+        self._row = {e: i for i, e in enumerate(self.entities)}
+        self._sets = {}
+
+    @classmethod
+    def from_sets(cls, burst_sets):
+        """BurstMap from an {entity: set of dates} dict."""
+        entities = list(burst_sets)
+        days = [sorted(d.toordinal() for d in burst_sets[e]) for e in entities]
+        offsets = np.zeros(len(entities) + 1, dtype=np.int64)
+        np.cumsum([len(d) for d in days], out=offsets[1:])
+        flat = np.fromiter((d for ds in days for d in ds), dtype=np.int32, count=offsets[-1])
+        return cls(entities, offsets, flat)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "offsets.npy"), np.asarray(self.offsets))
+        np.save(os.path.join(path, "day_ordinals.npy"), np.asarray(self.day_ordinals))
+        with open(os.path.join(path, "entities.json"), "w", encoding="utf-8") as f:
+            json.dump(self.entities, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        with open(os.path.join(path, "entities.json"), encoding="utf-8") as f:
+            entities = json.load(f)
+        return cls(entities,
+                   np.load(os.path.join(path, "offsets.npy"), mmap_mode=mmap_mode),
+                   np.load(os.path.join(path, "day_ordinals.npy"), mmap_mode=mmap_mode))
+
+    def days(self, entity):
+        i = self._row[entity]
+        return self.day_ordinals[self.offsets[i]:self.offsets[i + 1]]
+
+    def shared_days(self, e1, e2):
+        return np.intersect1d(self.days(e1), self.days(e2), assume_unique=True)
+
+    def __getitem__(self, entity):
+        s = self._sets.get(entity)
+        if s is None:
+            s = self._sets[entity] = frozenset(date.fromordinal(int(d)) for d in self.days(entity))
+        return s
+
+    def __iter__(self):
+        return iter(self.entities)
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __contains__(self, entity):
+        return entity in self._row
@@ -0,0 +1,121 @@
+"""Maximal clique enumeration for explicit-mode ECA.
+
+``maximal_cliques`` returns the same cliques as filtering
+``nx.find_cliques`` by size, with less work on dense, hub-heavy days:
+
+1. Only the (min_size - 1)-core can hold a clique of `min_size` nodes, and a
+   clique maximal in the core is maximal in the graph (a node outside the
+   core adjacent to all of it would itself be in the core), so everything
+   else is peeled off first.
+2. The core is enumerated with Bron-Kerbosch in degeneracy order with
+   Tomita pivoting: every node only starts cliques among its later
+   neighbours, so a branch never holds more than the degeneracy.
+3. A branch whose clique plus candidates is smaller than `min_size` is cut.
+
+With a `time_budget` (seconds) or `max_cliques`, enumeration stops once the
+budget is spent and the core nodes not yet in a clique are covered greedily
+instead: each grows one maximal clique by repeatedly adding the candidate
+with the most candidate neighbours (this cover runs after the budget, so it
+adds to the time spent). The result is then flagged as not exact.
+"""
+import time
+import heapq
+
+
+class _BudgetExceeded(Exception):
+    pass
+
+
+def core_nodes(adj, k):
+    """Nodes of the k-core of the graph given as a list of neighbour sets."""
+    degree = [len(a) for a in adj]
+    alive = [True] * len(adj)
+    stack = [v for v, d in enumerate(degree) if d < k]
+    for v in stack:
+        alive[v] = False
+    while stack:
+        v = stack.pop()
+        for u in adj[v]:
+            if alive[u]:
+                degree[u] -= 1
+                if degree[u] < k:
+                    alive[u] = False
+                    stack.append(u)
+    return {v for v in range(len(adj)) if alive[v]}
+
+def degeneracy_order(adj, nodes):
+    """`nodes` by repeatedly removing a node of minimum remaining degree."""
+    degree = {v: len(adj[v] & nodes) for v in nodes}
+    heap = [(d, v) for v, d in degree.items()]
+    heapq.heapify(heap)
+    order, removed = [], set()
+    while heap:
+        d, v = heapq.heappop(heap)
+        if v in removed or d != degree[v]:
+            continue
+        removed.add(v)
+        order.append(v)
+        for u in adj[v]:
+            if u in degree and u not in removed:
+                degree[u] -= 1
+                heapq.heappush(heap, (degree[u], u))
+    return order
+
+def _greedy_clique(v, adj, nodes):
+    clique, cand = [v], adj[v] & nodes
+    while cand:
+        w = max(cand, key=lambda u: (len(cand & adj[u]), -u))
+        clique.append(w)
+        cand &= adj[w]
+    return clique
+
+def maximal_cliques(adj, min_size=3, time_budget=None, max_cliques=None):
+    """(maximal cliques with at least `min_size` nodes as node lists, exact).
+
+    `adj` is a list of neighbour sets over nodes 0..n-1 (self-loops are
+    ignored). `exact` is False when the budget ran out and part of the core
+    was covered greedily.
+    """
+    adj = [a - {v} for v, a in enumerate(adj)]
+    nodes = core_nodes(adj, min_size - 1)
+    adj = [a & nodes for a in adj]
+    order = degeneracy_order(adj, nodes)
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    out, calls = [], 0
+
+    def expand(R, P, X):
+        nonlocal calls
+        if not P:
+            if not X and len(R) >= min_size:
+                if max_cliques is not None and len(out) >= max_cliques:
+                    raise _BudgetExceeded
+                out.append(R)
+            return
+        if len(R) + len(P) < min_size:
+            return
+        calls += 1
+        if deadline is not None and calls % 256 == 0 and time.perf_counter() > deadline:
+            raise _BudgetExceeded
+        pivot = max(P | X, key=lambda u: len(P & adj[u]))
+        for v in list(P - adj[pivot]):
+            expand(R + [v], P & adj[v], X & adj[v])
+            P.remove(v)
+            X.add(v)
+
+    position = {v: i for i, v in enumerate(order)}
+    try:
+        for v in order:
+            later = {u for u in adj[v] if position[u] > position[v]}
+            expand([v], later, adj[v] - later)
+        return out, True
+    except _BudgetExceeded:
+        found = {frozenset(c) for c in out}
+        covered = set().union(*found) if found else set()
+        for v in reversed(order):
+            if v not in covered:
+                clique = _greedy_clique(v, adj, nodes)
+                if len(clique) >= min_size and frozenset(clique) not in found:
+                    found.add(frozenset(clique))
+                    out.append(clique)
+                covered.update(clique)
+        return out, False
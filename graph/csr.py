@@ -0,0 +1,138 @@
+"""Integer-id CSR adjacency for the temporal graphs.
+
+A ``CSRGraph`` holds one day's undirected graph as arrays over the edit
+store's title intern table instead of a ``defaultdict(set)`` of titles:
+
+    node_ids  int32  title id of every node, in the order the dict-of-sets
+                     builder would have inserted it
+    indptr    int32  node -> range of its neighbours in `indices` (n + 1)
+    indices   int32  neighbour positions (into node_ids), sorted per node
+
+It still reads as the ``{title: neighbour titles}`` mapping the rest of the
+pipeline expects, and ``components`` finds connected components with a
+union-find over the edge arrays, in the same order as
+``networkx.connected_components`` on the equivalent dict, without building a
+networkx graph. The shared title table is not pickled with the graph, so
+graphs travel from worker processes as a few small arrays; the receiver
+reattaches it with ``attach``.
+"""
+import numpy as np
+from collections.abc import Mapping
+
+
+class CSRGraph(Mapping):
+    def __init__(self, titles, node_ids, indptr, indices):
+        self.titles = titles
+        self.node_ids = node_ids
+        self.indptr = indptr
+        self.indices = indices
+        self._pos = None
+
+    @classmethod
+    def from_edges(cls, edges, titles, title_ids):
+        """CSRGraph of the undirected (title, title) `edges`; nodes are
+        numbered in order of first appearance."""
+        local, node_ids, src, dst = {}, [], [], []
+        for pair in edges:
+            for t in pair:
+                if t not in local:
+                    local[t] = len(node_ids)
+                    node_ids.append(title_ids[t])
+            src.append(local[pair[0]])
+            dst.append(local[pair[1]])
+        src, dst = np.array(src, dtype=np.int32), np.array(dst, dtype=np.int32)
+        return cls._build(titles, np.array(node_ids, dtype=np.int32),
+                          np.concatenate([src, dst]), np.concatenate([dst, src]))
+
+    @classmethod
+    def from_adjacency(cls, graph, titles, title_ids):
+        """CSRGraph of a {title: neighbour titles} dict, keeping its key order."""
+        nodes = list(graph)
+        local = {t: i for i, t in enumerate(nodes)}
+        src = np.repeat(np.arange(len(nodes), dtype=np.int32), [len(graph[t]) for t in nodes])
+        dst = np.fromiter((local[n] for t in nodes for n in graph[t]), dtype=np.int32, count=len(src))
+        return cls._build(titles, np.array([title_ids[t] for t in nodes], dtype=np.int32), src, dst)
+
+    @classmethod
+    def _build(cls, titles, node_ids, src, dst):
+        keys = np.unique((src.astype(np.int64) << 32) | dst)
+        src, dst = (keys >> 32).astype(np.int32), (keys & 0xFFFFFFFF).astype(np.int32)
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=len(node_ids)), out=indptr[1:])
+        return cls(titles, node_ids, indptr, dst)
+
+    def attach(self, titles):
+        self.titles = titles
+        return self
+
+    def __getstate__(self):
+        return {"node_ids": self.node_ids, "indptr": self.indptr, "indices": self.indices}
+
+    def __setstate__(self, state):
+        self.__init__(None, state["node_ids"], state["indptr"], state["indices"])
+
+    # -- graph --
+
+    @property
+    def n_edges(self):
+        """Undirected edges, self-loops included."""
+        loops = int(np.sum(self.indices == np.repeat(np.arange(len(self.node_ids)), np.diff(self.indptr))))
+        return (len(self.indices) - loops) // 2 + loops
+
+    @property
+    def nbytes(self):
+        return self.node_ids.nbytes + self.indptr.nbytes + self.indices.nbytes
+
+    def neighbors(self, i):
+        """Positions of the neighbours of the node at position `i`."""
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+    def edges(self):
+        """(i, j) node positions of every undirected edge once, i <= j."""
+        src = np.repeat(np.arange(len(self.node_ids), dtype=np.int32), np.diff(self.indptr))
+        keep = src <= self.indices
+        return src[keep], self.indices[keep]
+
+    def components(self, min_size=1):
+        """Connected components with at least `min_size` nodes, as lists of
+        node positions, ordered by their first node."""
+        parent = list(range(len(self.node_ids)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for a, b in zip(*(e.tolist() for e in self.edges())):
+            ra, rb = find(a), find(b)
+            if ra != rb:
+                # the smaller position stays root, so roots are first nodes
+                parent[max(ra, rb)] = min(ra, rb)
+
+        groups = {}
+        for i in range(len(parent)):
+            groups.setdefault(find(i), []).append(i)
+        return [g for g in groups.values() if len(g) >= min_size]
+
+    def node_titles(self, positions):
+        return {self.titles[self.node_ids[i]] for i in positions}
+
+    # -- {title: neighbour titles} view --
+
+    def _positions(self):
+        if self._pos is None:
+            self._pos = {self.titles[t]: i for i, t in enumerate(self.node_ids.tolist())}
+        return self._pos
+
+    def __getitem__(self, title):
+        return self.node_titles(self.neighbors(self._positions()[title]))
+
+    def __iter__(self):
+        return (self.titles[t] for t in self.node_ids.tolist())
+
+    def __len__(self):
+        return len(self.node_ids)
+
+    def __contains__(self, title):
+        return title in self._positions()
@@ -0,0 +1,223 @@
+"""Compiled, memory-mapped columnar store for an ``edits_*.json`` directory.
+
+The store is built once next to the edit files (``<data_dir>/.edit_store``)
+and memory-mapped on every later run. It is a directory of ``.npy`` arrays:
+
+    entity.npy         int32  title id of the edited entity, per edit
+    timestamp.npy      int64  epoch seconds (UTC), per edit
+    day.npy            int32  ordinal of the UTC day (``date.toordinal()``), per edit
+    added_offsets.npy  int64  edit -> range of lines in line_offsets (n_edits + 1)
+    line_offsets.npy   int64  line -> byte range in added.npy (n_lines + 1)
+    added.npy          uint8  UTF-8 bytes of every added line
+    link_offsets.npy   int64  edit -> range of link ids in links.npy (n_edits + 1)
+    links.npy          int32  title ids of the links added by each edit (unique, by title)
+    titles.json               intern table shared by entities and link targets
+    manifest.json             fingerprint of the source files, written last
+
+Edits are stored in sorted file name order, then in file order. Recompiling
+over an existing store only parses the files whose size or mtime changed and
+copies the rows of the others across.
+"""
+import os
+import json
+import shutil
+import numpy as np
+from types import SimpleNamespace
+from datetime import datetime, timezone, date
+
+STORE_DIRNAME = ".edit_store"
+STORE_VERSION = 1
+
+_ARRAYS = ("entity", "timestamp", "day", "added_offsets", "line_offsets",
+           "added", "link_offsets", "links")
+
+
+# -----------------------
+# Freshness
+# -----------------------
+
+def source_files(data_dir):
+    return sorted(f for f in os.listdir(data_dir) if f.endswith(".json"))
+
+def source_fingerprint(data_dir):
+    """(name, size, mtime_ns) for every source file, in store order."""
+    fingerprint = []
+    for fname in source_files(data_dir):
+        st = os.stat(os.path.join(data_dir, fname))
+        fingerprint.append([fname, st.st_size, st.st_mtime_ns])
+    return fingerprint
+
+def store_is_fresh(data_dir, store_dir=None):
+    store_dir = store_dir or os.path.join(data_dir, STORE_DIRNAME)
+    try:
+        with open(os.path.join(store_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (manifest.get("version") == STORE_VERSION
+            and manifest.get("sources") == source_fingerprint(data_dir))
+
+
+# -----------------------
+# Compilation
+# -----------------------
+
+def _entity_rows(store):
+    """entity title -> (first row, end row); one file's edits are contiguous."""
+    ids, starts, counts = np.unique(store.entity, return_index=True, return_counts=True)
+    return {store.titles[e]: (s, s + c) for e, s, c in zip(ids, starts, counts)}
+
+def _row_slice(store, r0, r1):
+    """Rows [r0, r1) of a store (or of ingested columns) as a mergeable shard."""
+    l0, l1 = store.added_offsets[r0], store.added_offsets[r1]
+    b0, b1 = store.line_offsets[l0], store.line_offsets[l1]
+    k0, k1 = store.link_offsets[r0], store.link_offsets[r1]
+    return store.titles, {
+        "entity": np.asarray(store.entity[r0:r1]),
+        "timestamp": np.asarray(store.timestamp[r0:r1]),
+        "day": np.asarray(store.day[r0:r1]),
+        "added_offsets": store.added_offsets[r0:r1 + 1] - l0,
+        "line_offsets": store.line_offsets[l0:l1 + 1] - b0,
+        "added": np.asarray(store.added[b0:b1]),
+        "link_offsets": store.link_offsets[r0:r1 + 1] - k0,
+        "links": np.asarray(store.links[k0:k1]),
+    }
+
+def _splice(data_dir, store_dir, fingerprint, workers):
+    """Reuse the rows of unchanged files from the previous store and only
+    parse the changed ones; None if there is no usable previous store."""
+    from graph.ingest import ingest_directory, merge_shards
+
+    try:
+        with open(os.path.join(store_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != STORE_VERSION:
+            return None
+        old = EditStore(store_dir)
+    except (OSError, ValueError):
+        return None
+
+    before = {fname: (size, mtime) for fname, size, mtime in manifest["sources"]}
+    changed = [fname for fname, size, mtime in fingerprint if before.get(fname) != (size, mtime)]
+    titles, columns = ingest_directory(data_dir, changed, workers)
+    new = SimpleNamespace(titles=titles, **columns)
+    old_rows, new_rows = _entity_rows(old), _entity_rows(new)
+
+    # consecutive files from the same source collapse into one row range
+    changed = set(changed)
+    segments = []
+    for fname, _, _ in fingerprint:
+        entity = os.path.splitext(fname)[0][6:]
+        src, rows = (new, new_rows) if fname in changed else (old, old_rows)
+        if entity not in rows:
+            continue
+        r0, r1 = rows[entity]
+        if segments and segments[-1][0] is src and segments[-1][2] == r0:
+            segments[-1][2] = r1
+        else:
+            segments.append([src, r0, r1])
+    return merge_shards([_row_slice(src, r0, r1) for src, r0, r1 in segments])
+
+def compile_edit_store(data_dir, store_dir=None, workers=None):
+    from graph.ingest import ingest_directory
+
+    store_dir = store_dir or os.path.join(data_dir, STORE_DIRNAME)
+    fingerprint = source_fingerprint(data_dir)
+    compiled = _splice(data_dir, store_dir, fingerprint, workers)
+    if compiled is None:
+        compiled = ingest_directory(data_dir, [f for f, _, _ in fingerprint], workers)
+    titles, columns = compiled
+
+    # write into a scratch directory and swap it in, so a crash never leaves
+    # a half-written store behind a valid manifest
+    tmp_dir = store_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for name, arr in columns.items():
+        np.save(os.path.join(tmp_dir, name + ".npy"), arr)
+    with open(os.path.join(tmp_dir, "titles.json"), "w", encoding="utf-8") as f:
+        json.dump(titles, f, ensure_ascii=False)
+    with open(os.path.join(tmp_dir, "manifest.json"), "w") as f:
+        json.dump({"version": STORE_VERSION, "sources": fingerprint}, f)
+
+    shutil.rmtree(store_dir, ignore_errors=True)
+    os.replace(tmp_dir, store_dir)
+    return store_dir
+
+def open_edit_store(data_dir, store_dir=None, workers=None):
+    """Open the store for `data_dir`, (re)compiling it first if it is stale."""
+    store_dir = store_dir or os.path.join(data_dir, STORE_DIRNAME)
+    if not store_is_fresh(data_dir, store_dir):
+        compile_edit_store(data_dir, store_dir, workers)
+    return EditStore(store_dir)
+
+
+# -----------------------
+# Reader
+# -----------------------
+
+class EditStore:
+    """Read-only view over a compiled store.
+
+    Behaves like the list returned by ``build_all_edits(..., use_store=False)``:
+    indexing and iteration build the same edit dicts, but only on demand.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        for name in _ARRAYS:
+            setattr(self, name, np.load(os.path.join(store_dir, name + ".npy"), mmap_mode="r"))
+        with open(os.path.join(store_dir, "titles.json"), encoding="utf-8") as f:
+            self.titles = json.load(f)
+        self._title_ids = None
+
+    def __len__(self):
+        return len(self.entity)
+
+    def __getitem__(self, i):
+        return {
+            "entity": self.titles[self.entity[i]],
+            "timestamp": datetime.fromtimestamp(int(self.timestamp[i]), tz=timezone.utc),
+            "added": self.added_lines(i),
+            "links_added": self.link_titles(i),
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def title_ids(self):
+        if self._title_ids is None:
+            self._title_ids = {t: i for i, t in enumerate(self.titles)}
+        return self._title_ids
+
+    def added_lines(self, i):
+        lo, hi = self.added_offsets[i], self.added_offsets[i + 1]
+        bounds = self.line_offsets[lo:hi + 1]
+        return [bytes(self.added[a:b]).decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def link_ids(self, i):
+        return self.links[self.link_offsets[i]:self.link_offsets[i + 1]]
+
+    def link_titles(self, i):
+        return {self.titles[t] for t in self.link_ids(i)}
+
+    def edits(self, indices):
+        """Materialise the edit dicts for `indices` only."""
+        return [self[i] for i in indices]
+
+    def _group(self, keys):
+        order = np.argsort(keys, kind="stable")
+        values, starts = np.unique(keys[order], return_index=True)
+        return values, np.split(order, starts[1:])
+
+    def group_by_day(self):
+        """date -> edit indices, in store order within each day."""
+        values, groups = self._group(self.day)
+        return {date.fromordinal(int(d)): idx for d, idx in zip(values, groups)}
+
+    def group_by_entity(self):
+        """entity title -> edit indices, in store order within each entity."""
+        values, groups = self._group(self.entity)
+        return {self.titles[e]: idx for e, idx in zip(values, groups)}
@@ -0,0 +1,100 @@
+"""Event export: ``event_{id}.json`` files with the edits behind each event.
+
+An (entity, day) index over the edit store is built once; every event then
+resolves to its edit indices with two binary searches per entity, and the
+files are written record by record, optionally in a process pool. Export
+cost follows the number of edits exported, not corpus size x event count.
+
+Records come in edit store order (entities in sorted file order), not in
+the ``os.listdir`` order the old export used, so with ``indent=2`` a file
+has the old layout and the same records, possibly in a different order.
+"""
+import os
+import json
+import textwrap
+import numpy as np
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+from graph.edit_store import EditStore
+
+
+class EntityDayIndex:
+    """(entity id, day ordinal) -> edit indices over an EditStore."""
+
+    def __init__(self, store):
+        keys = (np.asarray(store.entity, dtype=np.int64) << 32) | np.asarray(store.day, dtype=np.int64)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def lookup(self, entity_ids, start_day, end_day):
+        """Indices of the edits of `entity_ids` from `start_day` to `end_day`
+        inclusive (day ordinals), in store order."""
+        parts = []
+        for e in entity_ids:
+            lo = np.searchsorted(self.keys, (e << 32) | start_day, side="left")
+            hi = np.searchsorted(self.keys, (e << 32) | end_day, side="right")
+            parts.append(self.order[lo:hi])
+        return np.sort(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64)
+
+
+def iter_event_records(store, indices, event_id):
+    for i in indices:
+        edit = store[i]
+        added_text = ' '.join(edit["added"])
+        if added_text.strip():
+            yield {
+                "text": added_text,
+                "timestamp": str(edit["timestamp"]),
+                "entity": edit["entity"],
+                "event_id": event_id
+            }
+
+def write_json_array(path, records, indent=None):
+    """Stream `records` into a JSON array; compact unless `indent` is given,
+    in which case the output matches json.dump(records, indent=indent)."""
+    if indent:
+        start, sep, end = "[\n", ",\n", "\n]"
+        dump = lambda r: textwrap.indent(json.dumps(r, indent=indent), " " * indent)
+    else:
+        start, sep, end = "[", ",", "]"
+        dump = lambda r: json.dumps(r, separators=(",", ":"))
+
+    n = 0
+    with open(path, "w") as f:
+        for record in records:
+            f.write((sep if n else start) + dump(record))
+            n += 1
+        f.write(end if n else "[]")
+    return n
+
+def _export_event(store, event_id, indices, outfile, indent):
+    if isinstance(store, str):
+        store = EditStore(store)
+    return write_json_array(outfile, iter_event_records(store, indices, event_id), indent)
+
+def _export_event_job(args):
+    return _export_event(*args)
+
+def export_events(store, events, output_dir, workers=None, indent=None, event_ids=None):
+    """Write one event_{id}.json per event (or per id in `event_ids`);
+    returns the edit count per written event."""
+    os.makedirs(output_dir, exist_ok=True)
+    index = EntityDayIndex(store)
+
+    jobs = []
+    for event_id, event in enumerate(events):
+        if event_ids is not None and event_id not in event_ids:
+            continue
+        start = date.fromisoformat(event["start"]).toordinal()
+        end = date.fromisoformat(event["end"]).toordinal()
+        ids = [store.title_ids[e] for e in event["entities"] if e in store.title_ids]
+        outfile = os.path.join(output_dir, f"event_{event_id}.json")
+        jobs.append((event_id, index.lookup(ids, start, end), outfile, indent))
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) < 2:
+        return [_export_event(store, *job) for job in jobs]
+    # workers reopen the store by path; the memory-mapped columns are shared
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_export_event_job, [(store.store_dir, *job) for job in jobs]))
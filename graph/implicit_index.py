@@ -0,0 +1,78 @@
+"""Inverted-index engine for the implicit graph.
+
+Computes the same edges as the pairwise scan in ``build_implicit_graph``
+(max over shared burst days of the token Jaccard >= threshold) without
+looking at every entity pair:
+
+1. Each (entity, day) with edits on one of the entity's burst days becomes a
+   row of an (entity, day) x token-id incidence matrix. Two entities can only
+   be similar on a day on which both have a row, i.e. a shared burst day.
+2. Rows of the same day are joined through a token inverted index. Tokens in
+   a row are ordered rarest-first and only a prefix of
+   ``|row| - ceil(t * |row|) + 1`` tokens is indexed and probed (prefix
+   filtering): two rows with Jaccard >= t always share a token in those
+   prefixes, so no edge is lost.
+3. Candidates that also pass the size filter ``t * |x| <= |y| <= |x|`` are
+   verified with the exact Jaccard.
+"""
+import math
+from collections import defaultdict, Counter
+
+from graph.metrics import counters
+
+_EPS = 1e-9
+
+
+def burst_day_token_rows(all_edits, burst_map):
+    """day -> {entity: token set} for the edits that fall on a burst day."""
+    rows = defaultdict(lambda: defaultdict(set))
+    for e in all_edits:
+        day = e['timestamp'].date()
+        if day in burst_map.get(e['entity'], ()):
+            for line in e.get('added', []):
+                rows[day][e['entity']].update(line.split())
+    return rows
+
+def _min_overlap(size, threshold):
+    return math.ceil(threshold * size - _EPS)
+
+def similar_pairs(token_sets, threshold):
+    """Yield (a, b, jaccard) for every pair of keys in `token_sets` whose
+    token sets have Jaccard >= `threshold` (which must be > 0)."""
+    keys = [k for k, s in token_sets.items() if s]
+    df = Counter(t for k in keys for t in token_sets[k])
+    ordered = {k: sorted(token_sets[k], key=lambda t: (df[t], t)) for k in keys}
+    keys.sort(key=lambda k: len(ordered[k]))
+
+    index = defaultdict(list)
+    checks = 0
+    for x in keys:
+        xs = token_sets[x]
+        nx = len(xs)
+        prefix = ordered[x][:nx - _min_overlap(nx, threshold) + 1]
+
+        candidates = set()
+        for t in prefix:
+            for y in index[t]:
+                if len(token_sets[y]) >= threshold * nx - _EPS:
+                    candidates.add(y)
+        checks += len(candidates)
+        for y in candidates:
+            ys = token_sets[y]
+            inter = len(xs & ys)
+            sim = inter / (nx + len(ys) - inter)
+            if sim >= threshold:
+                yield y, x, sim
+
+        for t in prefix:
+            index[t].append(x)
+    counters["implicit_similarity_checks"] += checks
+
+def build_implicit_graph_indexed(all_edits, burst_map, similarity_threshold=0.3):
+    """{e1: {e2: max similarity over shared burst days}}."""
+    graph = defaultdict(dict)
+    for day, token_sets in burst_day_token_rows(all_edits, burst_map).items():
+        for e1, e2, sim in similar_pairs(token_sets, similarity_threshold):
+            if sim > graph[e1].get(e2, 0):
+                graph[e1][e2] = graph[e2][e1] = sim
+    return graph
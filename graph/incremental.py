@@ -0,0 +1,183 @@
+"""Incremental re-runs of the main.py pipeline from checkpointed state.
+
+After every run ``<output_dir>/.checkpoint/state.pkl`` holds:
+
+    params       graph parameters the state was built with
+    eca_params   ECA parameters
+    files        fname -> (size, mtime_ns, sha1) of every edits_*.json
+    entity_days  entity -> days (YYYY-MM-DD) it has edits on
+    bursts       entity -> burst dates (implicit mode)
+    graphs       day -> temporal graph
+    open         day -> entity sets of the clusters ECA opened that day
+    events       ECA output
+
+On the next run a file only counts as changed when its content hash differs
+(hashes are reused while size and mtime are unchanged), or when it was added
+or removed. Only the entities of changed files get new burst maps, only the
+days those entities have edits on (before or after the change) get new
+graphs, and ECA resumes from the last day before the earliest graph that
+actually changed. That works because ECA only ever extends the clusters
+opened on the previous day: every event opened before that day is final, and
+the clusters opened on it are restored from their snapshot. Events that
+changed or contain a changed entity are re-exported.
+"""
+import os
+import pickle
+import hashlib
+from datetime import date
+
+from graph.build_graphs import build_all_edits
+from graph.bursts import detect_bursts_batch, entity_day_counts, BurstMap
+from graph.ECA import entity_cluster_aggregation
+from graph.edit_store import source_files
+from graph.export import export_events
+from graph.temporal import build_temporal_graphs
+
+STATE_VERSION = 1
+
+
+def file_hashes(data_dir, previous=None):
+    previous = previous or {}
+    hashes = {}
+    for fname in source_files(data_dir):
+        path = os.path.join(data_dir, fname)
+        st = os.stat(path)
+        old = previous.get(fname)
+        if old and old[0] == st.st_size and old[1] == st.st_mtime_ns:
+            hashes[fname] = old
+            continue
+        with open(path, "rb") as f:
+            hashes[fname] = (st.st_size, st.st_mtime_ns, hashlib.sha1(f.read()).hexdigest())
+    return hashes
+
+def changed_entities(old_hashes, new_hashes):
+    changed = {f for f in old_hashes.keys() | new_hashes.keys()
+               if (old_hashes.get(f) or (None,) * 3)[2] != (new_hashes.get(f) or (None,) * 3)[2]}
+    return {os.path.splitext(f)[0][6:] for f in changed}
+
+def entity_edit_days(store):
+    ents, days, _ = entity_day_counts(store.entity, store.day)
+    entity_days = {}
+    for e, d in zip(ents, days):
+        entity_days.setdefault(store.titles[e], set()).add(str(date.fromordinal(int(d))))
+    return entity_days
+
+def load_state(path):
+    try:
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    return state if state.get("version") == STATE_VERSION else None
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + ".tmp", path)
+
+def _event_key(event):
+    return frozenset(event["entities"]), event["start"], event["end"]
+
+
+def run_incremental(data_dir, output_dir, mode, delta_days=2, burst_percentile=90,
+                    similarity_threshold=0.3, gamma=0.8, engine="index",
+                    graph_workers=None, export_workers=None, export_indent=None):
+    """Run (or refresh) the pipeline for `data_dir`; returns (events, report)."""
+    state_path = os.path.join(output_dir, ".checkpoint", "state.pkl")
+    params = {"data_dir": os.path.abspath(data_dir), "mode": mode, "delta_days": delta_days,
+              "burst_percentile": burst_percentile, "similarity_threshold": similarity_threshold,
+              "engine": engine}
+    eca_params = {"gamma": gamma}
+
+    state = load_state(state_path)
+    full = state is None or state["params"] != params
+    files = file_hashes(data_dir, None if full else state["files"])
+    store = build_all_edits(data_dir)
+    entity_days = entity_edit_days(store)
+
+    # -- bursts and affected days --
+    if full:
+        affected = set(entity_days)
+        affected_days = None
+        bursts = dict(detect_bursts_batch(store, burst_percentile)) if mode == "implicit" else {}
+    else:
+        affected = changed_entities(state["files"], files)
+        affected_days = set()
+        for e in affected:
+            affected_days |= state["entity_days"].get(e, set()) | entity_days.get(e, set())
+        bursts = dict(state["bursts"])
+        if mode == "implicit" and affected:
+            for e in affected:
+                bursts.pop(e, None)
+            bursts.update(detect_bursts_batch(store, burst_percentile, entities=affected))
+
+    # -- temporal graphs --
+    graphs = {} if full else dict(state["graphs"])
+    changed_days = set()
+    if full or affected_days:
+        burst_map = BurstMap.from_sets(bursts) if mode == "implicit" else None
+        build_days = None if full else [date.fromisoformat(d) for d in affected_days]
+        new_graphs, _ = build_temporal_graphs(store, mode, burst_map, delta_days=delta_days,
+                                              similarity_threshold=similarity_threshold,
+                                              engine=engine, workers=graph_workers, days=build_days)
+        for day in (new_graphs if full else affected_days):
+            old = graphs.pop(day, None)
+            new = {k: set(v) for k, v in new_graphs.get(day, {}).items()}
+            if new:
+                graphs[day] = new
+            if old != (new or None):
+                changed_days.add(day)
+
+    # -- ECA, resumed from the last day before the earliest changed graph --
+    graphs = dict(sorted(graphs.items()))
+    eca_full = full or state["eca_params"] != eca_params
+    resumed_from = None
+    if eca_full or changed_days:
+        open_by_day, eca_state, tail = {}, None, graphs
+        if not eca_full:
+            resumed_from = min(changed_days)
+            earlier = [t for t in graphs if t < resumed_from]
+            if earlier:
+                t_prev = earlier[-1]
+                events = [{"entities": set(e["entities"]), "start": e["start"], "end": e["end"]}
+                          for e in state["events"] if e["start"] < t_prev]
+                reopened = [{"entities": set(c), "start": t_prev, "end": t_prev} for c in state["open"][t_prev]]
+                eca_state = (events + reopened, reopened)
+                open_by_day = {t: v for t, v in state["open"].items() if t <= t_prev}
+            tail = {t: g for t, g in graphs.items() if t >= resumed_from}
+
+        def on_step(time, merged_events, prev_clusters):
+            open_by_day[time] = [set(c["entities"]) for c in prev_clusters]
+
+        events = entity_cluster_aggregation(tail, strategy=mode, gamma=gamma,
+                                            state=eca_state, on_step=on_step)
+    else:
+        events, open_by_day = state["events"], state["open"]
+
+    # -- export what changed --
+    old_events = [] if full else state["events"]
+    to_export = {i for i, e in enumerate(events)
+                 if full or i >= len(old_events) or _event_key(e) != _event_key(old_events[i])
+                 or e["entities"] & affected}
+    export_events(store, events, output_dir, workers=export_workers, indent=export_indent,
+                  event_ids=to_export)
+    for i in range(len(events), len(old_events)):
+        stale = os.path.join(output_dir, f"event_{i}.json")
+        if os.path.exists(stale):
+            os.remove(stale)
+
+    save_state(state_path, {
+        "version": STATE_VERSION, "params": params, "eca_params": eca_params, "files": files,
+        "entity_days": entity_days, "bursts": bursts, "graphs": graphs,
+        "open": open_by_day, "events": events,
+    })
+    report = {
+        "full_rebuild": full,
+        "changed_entities": len(affected),
+        "rebuilt_days": len(graphs) if full else len(affected_days),
+        "changed_days": len(changed_days),
+        "eca_resumed_from": resumed_from,
+        "exported_events": len(to_export),
+    }
+    return events, report
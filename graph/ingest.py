@@ -0,0 +1,185 @@
+"""Parallel, streaming ingestion of an ``edits_*.json`` directory.
+
+The sorted file listing is cut into contiguous shards that are parsed in a
+process pool. Each file is decoded one edit at a time (``iter_json_array``)
+so a single huge entity file never has to be held in memory as a whole, and
+each shard comes back as a handful of flat NumPy columns (see
+graph/edit_store.py for the layout) instead of a pickled list of dicts.
+Shards are merged in listing order, so the result does not depend on the
+number of workers.
+"""
+import os
+import json
+import numpy as np
+from array import array
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+CHUNK_SIZE = 1 << 16
+SHARDS_PER_WORKER = 4
+
+_WS = " \t\n\r"
+_DELIMITERS = ",:]}" + _WS  # what may follow a complete JSON value
+
+# -----------------------
+# Streaming decoder
+# -----------------------
+
+def iter_json_array(path, chunk_size=CHUNK_SIZE):
+    """Yield the elements of the top-level JSON array in `path` one by one."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill(buf, pos, size):
+            more = f.read(size)
+            return buf[pos:] + more, 0, not more
+
+        def skip_ws(buf, pos, eof):
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf) or eof:
+                    return buf, pos, eof
+                buf, pos, eof = fill(buf, pos, chunk_size)
+
+        buf, pos, eof = skip_ws(buf, pos, eof)
+        if buf[pos:pos + 1] != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+
+        first = True
+        while True:
+            buf, pos, eof = skip_ws(buf, pos, eof)
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            if not first:
+                if buf[pos] != ",":
+                    raise ValueError(f"{path}: expected ',' at offset {pos}")
+                buf, pos, eof = skip_ws(buf, pos + 1, eof)
+            first = False
+
+            # grow the buffer until one whole element decodes; an element not
+            # followed by a delimiter may still be truncated (a number cut at
+            # "1." or "12e" decodes as a shorter number)
+            while True:
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                    if eof or (end < len(buf) and buf[end] in _DELIMITERS):
+                        break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                buf, pos, eof = fill(buf, pos, max(chunk_size, len(buf)))
+            yield item
+            pos = end
+
+
+# -----------------------
+# Shard parsing
+# -----------------------
+
+def parse_shard(data_dir, fnames):
+    """Parse `fnames` into (titles, columns) with shard-local title ids."""
+    from graph.build_graphs import extract_links
+
+    titles, title_ids = [], {}
+    def intern(title):
+        tid = title_ids.get(title)
+        if tid is None:
+            tid = title_ids[title] = len(titles)
+            titles.append(title)
+        return tid
+
+    entity, timestamp, day = array("i"), array("q"), array("i")
+    added_offsets, line_offsets, link_offsets = array("q", [0]), array("q", [0]), array("q", [0])
+    links = array("i")
+    added = bytearray()
+
+    for fname in fnames:
+        eid = intern(os.path.splitext(fname)[0][6:])
+        for edit in iter_json_array(os.path.join(data_dir, fname)):
+            ts = datetime.fromisoformat(edit["timestamp"].replace("Z", "+00:00"))
+            lines = edit.get("added", [])
+            entity.append(eid)
+            timestamp.append(int(ts.timestamp()))
+            day.append(ts.astimezone(timezone.utc).date().toordinal())
+            for line in lines:
+                added += line.encode("utf-8")
+                line_offsets.append(len(added))
+            added_offsets.append(len(line_offsets) - 1)
+            links.extend(intern(l) for l in sorted(extract_links(lines)))
+            link_offsets.append(len(links))
+
+    columns = {
+        "entity": np.frombuffer(entity, dtype=np.int32),
+        "timestamp": np.frombuffer(timestamp, dtype=np.int64),
+        "day": np.frombuffer(day, dtype=np.int32),
+        "added_offsets": np.frombuffer(added_offsets, dtype=np.int64),
+        "line_offsets": np.frombuffer(line_offsets, dtype=np.int64),
+        "added": np.frombuffer(bytes(added), dtype=np.uint8),
+        "link_offsets": np.frombuffer(link_offsets, dtype=np.int64),
+        "links": np.frombuffer(links, dtype=np.int32),
+    }
+    return titles, columns
+
+def _parse_shard(args):
+    return parse_shard(*args)
+
+
+# -----------------------
+# Merge
+# -----------------------
+
+def merge_shards(shards):
+    """Concatenate shards in order, re-interning titles into one table."""
+    titles, title_ids = [], {}
+    parts = {name: [] for name in ("entity", "timestamp", "day", "added", "links")}
+    offsets = {"added_offsets": [np.zeros(1, np.int64)], "line_offsets": [np.zeros(1, np.int64)],
+               "link_offsets": [np.zeros(1, np.int64)]}
+    n_lines = n_bytes = n_links = 0
+
+    for shard_titles, cols in shards:
+        remap = np.empty(len(shard_titles), dtype=np.int32)
+        for local, title in enumerate(shard_titles):
+            tid = title_ids.get(title)
+            if tid is None:
+                tid = title_ids[title] = len(titles)
+                titles.append(title)
+            remap[local] = tid
+
+        parts["entity"].append(remap[cols["entity"]])
+        parts["links"].append(remap[cols["links"]])
+        parts["timestamp"].append(cols["timestamp"])
+        parts["day"].append(cols["day"])
+        parts["added"].append(cols["added"])
+        offsets["added_offsets"].append(cols["added_offsets"][1:] + n_lines)
+        offsets["line_offsets"].append(cols["line_offsets"][1:] + n_bytes)
+        offsets["link_offsets"].append(cols["link_offsets"][1:] + n_links)
+        n_lines += len(cols["line_offsets"]) - 1
+        n_bytes += len(cols["added"])
+        n_links += len(cols["links"])
+
+    dtypes = {"entity": np.int32, "links": np.int32, "timestamp": np.int64,
+              "day": np.int32, "added": np.uint8}
+    columns = {name: np.concatenate(p) if p else np.zeros(0, dtypes[name]) for name, p in parts.items()}
+    columns.update({name: np.concatenate(p) for name, p in offsets.items()})
+    return titles, columns
+
+def ingest_directory(data_dir, fnames, workers=None):
+    """Parse `fnames` (in order) from `data_dir` into one (titles, columns) pair.
+
+    ``workers=1`` parses in-process; otherwise the listing is sharded across
+    a pool of `workers` processes (default: all cores).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(fnames) < 2:
+        return merge_shards([parse_shard(data_dir, fnames)])
+
+    n_shards = min(len(fnames), workers * SHARDS_PER_WORKER)
+    bounds = np.linspace(0, len(fnames), n_shards + 1).astype(int)
+    jobs = [(data_dir, fnames[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return merge_shards(pool.map(_parse_shard, jobs))
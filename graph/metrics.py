@@ -0,0 +1,83 @@
+"""Run instrumentation: hot-path counters and per-stage time and memory.
+
+``counters`` is a process-wide Counter that the hot paths add to once per
+call (never per pair), so leaving it on costs nothing measurable:
+
+    implicit_pairs_considered   entity pairs a full scan would compare
+    implicit_pairs_pruned       ... of those never scored (filters / LSH)
+    implicit_similarity_checks  similarities computed (or estimated)
+    implicit_edges              entity pairs linked in the graph
+    reciprocal_link_keys        (entity, linked title) keys joined
+    reciprocal_link_probes      timestamp window probes (binary searches)
+    eca_clusters                clusters extracted from the temporal graphs
+    eca_cluster_comparisons     open clusters compared against a new one
+    eca_full_scan_comparisons   ... comparisons an all-pairs scan would make
+
+``note(kind, **info)`` records one-off events that a run report should
+list individually, such as a day that fell back to an approximation.
+
+Worker processes return their counter deltas (``counter_delta``) with their
+results and the parent merges them, so totals do not depend on the worker
+count.
+
+``Stages`` times named pipeline stages and records the peak resident set
+size of the process during each one. On Linux the peak is reset at every
+stage start (``/proc/self/clear_refs``), so each figure is that stage's own
+peak; elsewhere it is the peak so far. Worker processes are reported
+separately as the largest peak of any finished child.
+"""
+import sys
+import time
+import resource
+from collections import Counter
+from contextlib import contextmanager
+
+counters = Counter()
+notes = []
+
+
+def counter_delta(before):
+    """Counts added to `counters` since the `before` snapshot."""
+    return {k: v - before.get(k, 0) for k, v in counters.items() if k not in before or v != before[k]}
+
+def note(kind, **info):
+    notes.append({"kind": kind, **info})
+
+def _reset_peak_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _max_rss_mb(who):
+    rss = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class Stages:
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name, **info):
+        """Time the body as stage `name`; `info` and anything the body adds to
+        the yielded dict end up in the stage record."""
+        record = {"name": name, **info}
+        per_stage = _reset_peak_rss()
+        before = Counter(counters)
+        t = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time.perf_counter() - t
+            record["peak_rss_mb"] = round(_max_rss_mb(resource.RUSAGE_SELF), 1)
+            record["peak_rss_per_stage"] = per_stage
+            record["children_peak_rss_mb"] = round(_max_rss_mb(resource.RUSAGE_CHILDREN), 1)
+            record["counters"] = counter_delta(before)
+            self.stages.append(record)
+
+    def to_list(self):
+        return list(self.stages)
@@ -0,0 +1,191 @@
+"""The main.py pipeline as a function of a config dict, with a run report.
+
+Stages (load, bursts, graphs, eca, export) are timed and their peak memory
+and hot-path counters recorded (graph/metrics.py). The report is a plain
+JSON-serialisable dict:
+
+    config        the effective config
+    host          platform, python version, cpu count
+    stages        [{name, seconds, peak_rss_mb, children_peak_rss_mb, counters, ...}]
+    counters      counter totals over the run
+    notes         one-off events, e.g. days whose cliques ran out of budget
+    totals        edits, entities, temporal graphs, events
+    slowest_days  the five slowest temporal graph builds
+    cache         stage cache hits and misses (graph/stage_cache.py)
+    seconds       wall time of the whole run
+
+With the stage cache on, bursts, temporal graphs and ECA events are reused
+from earlier runs with the same input files and upstream parameters; the
+graphs stage then reports no per-day timings.
+"""
+import os
+import sys
+import json
+import time
+import platform
+from datetime import datetime, timezone
+
+from graph.build_graphs import build_all_edits
+from graph.ECA import entity_cluster_aggregation
+from graph.bursts import detect_bursts_batch
+from graph.export import export_events
+from graph.incremental import run_incremental
+from graph.metrics import Stages, counters, counter_delta, notes
+from graph.stage_cache import CACHE_DIRNAME, StageCache, stage_key
+from graph.temporal import build_temporal_graphs
+
+DEFAULT_CONFIG = {
+    "data_dir": "data/debate/",
+    "output_dir": "outputs/debate",
+    "mode": "implicit",              # "explicit" or "implicit"
+    "delta_days": 2,
+    "burst_percentile": 90,
+    "similarity_threshold": 0.3,
+    "jaccard_threshold": 0.8,
+    "clique_time_budget": None,      # seconds per day before explicit cliques are approximated
+    "clique_max": None,              # cliques per day before explicit cliques are approximated
+    "implicit_engine": "index",      # or "pairwise", the original all-pairs scan
+    "graph_workers": None,           # all cores
+    "export_workers": None,          # all cores
+    "export_indent": None,           # compact; 2 for the old pretty-printed layout (store record order)
+    "incremental": False,            # refresh from the last run's checkpoint (graph/incremental.py)
+    "stage_cache": True,             # reuse bursts, graphs and events of identical inputs + parameters
+    "cache_dir": None,               # default: <data_dir>/.stage_cache
+    "report": None,                  # default: <output_dir>/run_report.json
+}
+
+
+def load_config(path=None, overrides=None):
+    """DEFAULT_CONFIG, updated from the JSON file at `path`, then `overrides`."""
+    config = dict(DEFAULT_CONFIG)
+    if path:
+        with open(path, encoding="utf-8") as f:
+            config.update(json.load(f))
+    config.update(overrides or {})
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown config keys: {sorted(unknown)}")
+    if config["mode"] not in ("explicit", "implicit"):
+        raise ValueError(f"Unknown mode: {config['mode']}")
+    return config
+
+def report_path(config):
+    return config["report"] or os.path.join(config["output_dir"], "run_report.json")
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+
+
+def run_pipeline(config):
+    """Run the pipeline for `config` (see load_config); returns (events, report)."""
+    c = config
+    os.makedirs(c["output_dir"], exist_ok=True)
+    stages = Stages()
+    started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    start, start_notes = dict(counters), len(notes)
+    t0 = time.perf_counter()
+    totals, slowest_days = {}, []
+    cache = None
+    if c["stage_cache"] and not c["incremental"]:
+        cache = StageCache(c["cache_dir"] or os.path.join(c["data_dir"], CACHE_DIRNAME))
+
+    def cached(stage, key, compute):
+        return cache.get(stage, key, compute) if cache else compute()
+
+    if c["incremental"]:
+        # reuses <output_dir>/.checkpoint and only recomputes what changed inputs affect
+        print("♻️ Refreshing from checkpoint...")
+        with stages.stage("incremental") as s:
+            events, s["report"] = run_incremental(
+                c["data_dir"], c["output_dir"], c["mode"],
+                delta_days=c["delta_days"],
+                burst_percentile=c["burst_percentile"],
+                similarity_threshold=c["similarity_threshold"],
+                gamma=c["jaccard_threshold"],
+                engine=c["implicit_engine"],
+                graph_workers=c["graph_workers"],
+                export_workers=c["export_workers"],
+                export_indent=c["export_indent"]
+            )
+        print(s["report"])
+    else:
+        print("🔍 Loading edits...")
+        with stages.stage("load"):
+            all_edits = build_all_edits(c["data_dir"])
+        totals["edits"] = len(all_edits)
+        totals["entities"] = len(all_edits.titles)
+        print(f"Loaded {len(all_edits)} edits.")
+        key = cache.input_key(c["data_dir"]) if cache else None
+
+        burst_map = None
+        if c["mode"] == "implicit":
+            print("📈 Detecting bursts for implicit mode...")
+            with stages.stage("bursts"):
+                key = stage_key("bursts", key, {"burst_percentile": c["burst_percentile"]})
+                burst_map = cached("bursts", key,
+                                   lambda: detect_bursts_batch(all_edits, c["burst_percentile"]))
+            totals["burst_entities"] = len(burst_map)
+
+        # one task per day, spread over graph_workers processes
+        day_timings = []
+
+        def build_graphs():
+            graphs, timings = build_temporal_graphs(
+                all_edits, c["mode"], burst_map,
+                delta_days=c["delta_days"],
+                similarity_threshold=c["similarity_threshold"],
+                engine=c["implicit_engine"],
+                workers=c["graph_workers"]
+            )
+            day_timings.extend(timings)
+            return graphs
+
+        with stages.stage("graphs", workers=c["graph_workers"] or os.cpu_count()):
+            params = ({"mode": "explicit", "delta_days": c["delta_days"]} if c["mode"] == "explicit" else
+                      {"mode": "implicit", "similarity_threshold": c["similarity_threshold"],
+                       "engine": c["implicit_engine"]})
+            key = stage_key("graphs", key, params)
+            temporal_graphs = cached("graphs", key, build_graphs)
+        totals["temporal_graphs"] = len(temporal_graphs)
+        slowest_days = sorted(day_timings, key=lambda t: t["seconds"], reverse=True)[:5]
+
+        print(f"Built {len(temporal_graphs)} temporal graphs.")
+        for t in slowest_days:
+            print(f"   {t['day']}: {t['seconds']:.3f}s ({t['edits']} edits, {t['nodes']} nodes)")
+
+        print("Running Entity Cluster Aggregation...")
+        with stages.stage("eca"):
+            params = {"gamma": c["jaccard_threshold"]}
+            if c["mode"] == "explicit":
+                params.update(clique_time_budget=c["clique_time_budget"], clique_max=c["clique_max"])
+            key = stage_key("events", key, params)
+            events = cached("events", key, lambda: entity_cluster_aggregation(
+                temporal_graphs,
+                strategy=c["mode"],
+                gamma=c["jaccard_threshold"],
+                clique_time_budget=c["clique_time_budget"],
+                clique_max=c["clique_max"]
+            ))
+
+        print("Saving event data for inference...")
+        with stages.stage("export", workers=c["export_workers"] or os.cpu_count()):
+            export_events(all_edits, events, c["output_dir"],
+                          workers=c["export_workers"], indent=c["export_indent"])
+
+    totals["events"] = len(events)
+    report = {
+        "config": config,
+        "started_at": started_at,
+        "host": {"platform": platform.platform(), "python": sys.version.split()[0],
+                 "cpu_count": os.cpu_count()},
+        "stages": stages.to_list(),
+        "counters": dict(sorted(counter_delta(start).items())),
+        "notes": notes[start_notes:],
+        "totals": totals,
+        "slowest_days": slowest_days,
+        "cache": cache.summary() if cache else None,
+        "seconds": time.perf_counter() - t0,
+    }
+    return events, report
@@ -0,0 +1,199 @@
+"""Streaming quantile sketches for burst thresholds.
+
+``detect_bursts`` needs every daily count of an entity to call
+``np.percentile``. ``QuantileSketch`` instead summarises the daily counts in
+a fixed-size histogram that takes one O(1) update per closed day and
+serialises to a small dict:
+
+* counts up to `exact_max` are kept exactly, one bucket per value;
+* larger counts go to logarithmic buckets ``(g^(i-1), g^i]`` with
+  ``g = (1 + a) / (1 - a)`` for relative accuracy `a`, represented by
+  ``2 g^i / (g + 1)``, which is within a factor ``1 +- a`` of any value in
+  the bucket (the DDSketch construction).
+
+``quantile(q)`` uses the same linear interpolation between the order
+statistics at ranks ``floor(h)`` and ``floor(h) + 1``, ``h = (n - 1) q / 100``,
+as ``np.percentile``. Error bounds against the exact ``BURST_PERCENTILE``
+threshold `t`:
+
+* if both order statistics are <= `exact_max`, the estimate equals `t`
+  (up to float rounding) and the burst days are identical;
+* otherwise ``|estimate - t| <= a * t``, so the only days that can be
+  classified differently have a count within ``a * t`` of the threshold.
+
+The number of buckets is at most ``exact_max + log(max_count / exact_max) /
+log(g) + 1`` whatever the number of days, so a threshold query is O(1) in
+the history length as well.
+
+    python -m graph.quantile data/debate/ data/election/ data/riots/
+
+reports the threshold error and burst-day disagreements on stored datasets.
+"""
+import os
+import sys
+import json
+import math
+
+RELATIVE_ACCURACY = 0.01
+EXACT_MAX = 64
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=RELATIVE_ACCURACY, exact_max=EXACT_MAX):
+        self.relative_accuracy = relative_accuracy
+        self.exact_max = exact_max
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.exact = {}
+        self.log = {}
+        self.count = 0
+
+    def add(self, value, weight=1):
+        if value <= self.exact_max:
+            self.exact[value] = self.exact.get(value, 0) + weight
+        else:
+            i = math.ceil(math.log(value) / self._log_gamma)
+            self.log[i] = self.log.get(i, 0) + weight
+        self.count += weight
+
+    def merge(self, other):
+        for v, n in other.exact.items():
+            self.exact[v] = self.exact.get(v, 0) + n
+        for i, n in other.log.items():
+            self.log[i] = self.log.get(i, 0) + n
+        self.count += other.count
+
+    def _buckets(self):
+        for v in sorted(self.exact):
+            yield v, self.exact[v]
+        for i in sorted(self.log):
+            yield 2 * self.gamma ** i / (self.gamma + 1), self.log[i]
+
+    def _values_at(self, ranks):
+        """Representative values at the sorted 0-based `ranks`."""
+        values, seen, it = [], 0, iter(ranks)
+        rank = next(it, None)
+        for value, n in self._buckets():
+            seen += n
+            while rank is not None and rank < seen:
+                values.append(value)
+                rank = next(it, None)
+            if rank is None:
+                break
+        return values
+
+    def quantile(self, q):
+        """Estimate of np.percentile(values, q); None when empty."""
+        if not self.count:
+            return None
+        h = (self.count - 1) * (q / 100)
+        lo = math.floor(h)
+        hi = min(lo + 1, self.count - 1)
+        a, b = self._values_at([lo, hi])
+        t = h - lo
+        return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+    def to_dict(self):
+        return {"relative_accuracy": self.relative_accuracy, "exact_max": self.exact_max,
+                "exact": self.exact, "log": self.log, "count": self.count}
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d["relative_accuracy"], d["exact_max"])
+        sketch.exact = {int(v): n for v, n in d["exact"].items()}
+        sketch.log = {int(i): n for i, n in d["log"].items()}
+        sketch.count = d["count"]
+        return sketch
+
+
+class BurstSketches:
+    """Per-entity daily-count sketches; a closed day is a burst day when its
+    count reaches the sketched `percentile` of the entity's days so far."""
+
+    def __init__(self, percentile=90, relative_accuracy=RELATIVE_ACCURACY, exact_max=EXACT_MAX):
+        self.percentile = percentile
+        self.relative_accuracy = relative_accuracy
+        self.exact_max = exact_max
+        self.sketches = {}
+
+    def add_day(self, entity, count):
+        """Record one closed day of `entity`; returns whether it is a burst day."""
+        sketch = self.sketches.get(entity)
+        if sketch is None:
+            sketch = self.sketches[entity] = QuantileSketch(self.relative_accuracy, self.exact_max)
+        sketch.add(count)
+        return count >= sketch.quantile(self.percentile)
+
+    def threshold(self, entity):
+        sketch = self.sketches.get(entity)
+        return sketch.quantile(self.percentile) if sketch else None
+
+    def burst_map(self, store):
+        """BurstMap over an EditStore using the sketched thresholds."""
+        from graph.bursts import detect_bursts_batch
+        return detect_bursts_batch(store, self.percentile, thresholds=self.threshold)
+
+    @classmethod
+    def from_store(cls, store, percentile=90, relative_accuracy=RELATIVE_ACCURACY, exact_max=EXACT_MAX):
+        from graph.bursts import entity_day_counts
+
+        sketches = cls(percentile, relative_accuracy, exact_max)
+        ents, _, counts = entity_day_counts(store.entity, store.day)
+        for e, c in zip(ents, counts):
+            title = store.titles[e]
+            sketch = sketches.sketches.get(title)
+            if sketch is None:
+                sketch = sketches.sketches[title] = QuantileSketch(relative_accuracy, exact_max)
+            sketch.add(int(c))
+        return sketches
+
+    def save(self, path):
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"percentile": self.percentile, "relative_accuracy": self.relative_accuracy,
+                       "exact_max": self.exact_max,
+                       "sketches": {e: s.to_dict() for e, s in self.sketches.items()}}, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            d = json.load(f)
+        sketches = cls(d["percentile"], d["relative_accuracy"], d["exact_max"])
+        sketches.sketches = {e: QuantileSketch.from_dict(s) for e, s in d["sketches"].items()}
+        return sketches
+
+
+# -----------------------
+# Error report
+# -----------------------
+
+def error_report(data_dir, percentile=90, relative_accuracy=RELATIVE_ACCURACY, exact_max=EXACT_MAX):
+    from graph.build_graphs import build_all_edits
+    from graph.bursts import detect_bursts_batch, entity_day_counts, percentile_thresholds
+
+    store = build_all_edits(data_dir)
+    exact = detect_bursts_batch(store, percentile)
+    sketches = BurstSketches.from_store(store, percentile, relative_accuracy, exact_max)
+    approx = sketches.burst_map(store)
+
+    ents, _, counts = entity_day_counts(store.entity, store.day)
+    rows, thresholds = percentile_thresholds(ents, counts, percentile)
+    errors = [abs(sketches.threshold(store.titles[e]) - t) / t for e, t in zip(rows, thresholds)]
+
+    disagreements = sum(len(exact[e] ^ approx[e]) for e in exact)
+    return {
+        "data_dir": data_dir,
+        "percentile": percentile,
+        "relative_accuracy": relative_accuracy,
+        "exact_max": exact_max,
+        "entities": len(exact),
+        "max_relative_threshold_error": max(errors, default=0.0),
+        "burst_day_disagreements": disagreements,
+        "burst_days": sum(len(exact[e]) for e in exact),
+    }
+
+
+if __name__ == "__main__":
+    for data_dir in sys.argv[1:] or ["data/debate/", "data/election/", "data/riots/"]:
+        for exact_max in (EXACT_MAX, 0):
+            print(json.dumps(error_report(data_dir, exact_max=exact_max), indent=2))
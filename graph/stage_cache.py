@@ -0,0 +1,151 @@
+"""Content-addressed cache of pipeline stage outputs.
+
+Every entry is keyed by a hash of what produced it:
+
+    input key   sha1 of the (name, content sha1) of every edits_*.json file
+    bursts      input key + burst percentile
+    graphs      input key + graph parameters (+ bursts key in implicit mode)
+    events      graphs key + ECA parameters
+
+so a run that only changes ECA or export parameters reuses the temporal
+graphs, and any edit to the data misses everything downstream of it.
+Content hashes are only recomputed for files whose size or mtime changed
+(``inputs.json``). Entries live in ``<cache_dir>/<stage>/<key>/``:
+
+    bursts   a saved BurstMap (npy arrays + entities.json)
+    graphs   graphs.npz (day ordinals, per-day node and edge offsets, and
+             every day's CSRGraph arrays in its own node order, so ECA sees
+             the same graphs on a hit as on a miss) + titles.json
+    events   events.json
+
+Entries are written to a temporary directory and renamed into place, so an
+interrupted run never leaves a half-written entry behind.
+"""
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+from datetime import date
+
+from graph.bursts import BurstMap
+from graph.csr import CSRGraph
+from graph.incremental import file_hashes
+
+CACHE_DIRNAME = ".stage_cache"
+CACHE_VERSION = 2
+
+
+def stage_key(stage, parent_key, params):
+    blob = json.dumps([CACHE_VERSION, stage, parent_key, params], sort_keys=True, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()
+
+
+# -----------------------
+# Codecs
+# -----------------------
+
+def _save_graphs(graphs, path):
+    titles, ids = [], {}
+    days, node_ids, indptr, indices = [], [], [], []
+    node_offsets, edge_offsets = [0], [0]
+    for day, graph in sorted(graphs.items()):
+        if not isinstance(graph, CSRGraph):
+            graph = CSRGraph.from_adjacency(graph, list(graph), {t: i for i, t in enumerate(graph)})
+        for t in graph:
+            if t not in ids:
+                ids[t] = len(titles)
+                titles.append(t)
+        days.append(date.fromisoformat(day).toordinal())
+        node_ids.extend(ids[t] for t in graph)
+        indptr.append(graph.indptr)
+        indices.append(graph.indices)
+        node_offsets.append(len(node_ids))
+        edge_offsets.append(edge_offsets[-1] + len(graph.indices))
+    np.savez_compressed(os.path.join(path, "graphs.npz"),
+                        days=np.array(days, dtype=np.int32),
+                        node_offsets=np.array(node_offsets, dtype=np.int64),
+                        edge_offsets=np.array(edge_offsets, dtype=np.int64),
+                        node_ids=np.array(node_ids, dtype=np.int32),
+                        indptr=np.concatenate(indptr or [np.zeros(0, np.int32)]).astype(np.int32),
+                        indices=np.concatenate(indices or [np.zeros(0, np.int32)]).astype(np.int32))
+    with open(os.path.join(path, "titles.json"), "w", encoding="utf-8") as f:
+        json.dump(titles, f, ensure_ascii=False)
+
+def _load_graphs(path):
+    with open(os.path.join(path, "titles.json"), encoding="utf-8") as f:
+        titles = json.load(f)
+    data = np.load(os.path.join(path, "graphs.npz"))
+    nodes, edges = data["node_offsets"], data["edge_offsets"]
+    graphs = {}
+    for k, d in enumerate(data["days"]):
+        # every day's indptr has one entry more than it has nodes
+        indptr = data["indptr"][nodes[k] + k:nodes[k + 1] + k + 1]
+        graphs[str(date.fromordinal(int(d)))] = CSRGraph(
+            titles, data["node_ids"][nodes[k]:nodes[k + 1]], indptr, data["indices"][edges[k]:edges[k + 1]])
+    return graphs
+
+def _save_events(events, path):
+    with open(os.path.join(path, "events.json"), "w", encoding="utf-8") as f:
+        json.dump([{"entities": sorted(e["entities"]), "start": e["start"], "end": e["end"]}
+                   for e in events], f, ensure_ascii=False)
+
+def _load_events(path):
+    with open(os.path.join(path, "events.json"), encoding="utf-8") as f:
+        return [{"entities": set(e["entities"]), "start": e["start"], "end": e["end"]} for e in json.load(f)]
+
+_CODECS = {
+    "bursts": (lambda burst_map, path: burst_map.save(path), BurstMap.load),
+    "graphs": (_save_graphs, _load_graphs),
+    "events": (_save_events, _load_events),
+}
+
+
+class StageCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.report = []
+
+    def input_key(self, data_dir):
+        """Content key of the edit files; hashes are reused while size and mtime match."""
+        path = os.path.join(self.cache_dir, "inputs.json")
+        try:
+            with open(path) as f:
+                previous = {k: tuple(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError):
+            previous = {}
+        hashes = file_hashes(data_dir, previous)
+        if hashes != previous:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                json.dump(hashes, f)
+            os.replace(path + ".tmp", path)
+        return stage_key("inputs", None, sorted((f, h[2]) for f, h in hashes.items()))
+
+    def _entry(self, stage, key):
+        return os.path.join(self.cache_dir, stage, key)
+
+    def get(self, stage, key, compute):
+        """The cached `stage` output for `key`, or compute(), stored under `key`."""
+        t = time.perf_counter()
+        entry = self._entry(stage, key)
+        save, load = _CODECS[stage]
+        if os.path.isdir(entry):
+            value, hit = load(entry), True
+        else:
+            value, hit = compute(), False
+            tmp = entry + ".tmp"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            save(value, tmp)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+        self.report.append({"stage": stage, "key": key, "hit": hit,
+                            "seconds": time.perf_counter() - t})
+        return value
+
+    def summary(self):
+        return {"hits": sum(r["hit"] for r in self.report),
+                "misses": sum(not r["hit"] for r in self.report),
+                "stages": list(self.report)}
@@ -0,0 +1,224 @@
+"""Online event detection over an edit feed in timestamp order.
+
+``StreamingEventDetector`` consumes edits one at a time, e.g. from a JSONL
+feed replayed from disk in place of Wikipedia's recent-changes stream, and
+only keeps bounded state:
+
+* the edits of the day that is still open;
+* per entity, the edit counts of its active days within the last
+  `burst_history_days` days (entities idle for longer are evicted), or,
+  with `burst_sketches`, one constant-size quantile sketch over its whole
+  history (graph/quantile.py) that can be saved and reloaded across restarts;
+* the clusters ECA opened on the last graph day, the only ones it can still
+  extend.
+
+When the first edit of a later day arrives, the open day is closed: its
+graph is built exactly as in batch mode (explicit: reciprocal links among
+that day's edits; implicit: token Jaccard among the entities bursting that
+day), ECA takes one step, and every event that can no longer grow is
+emitted. The one difference from batch mode is that a burst day is judged
+against the entity's trailing history instead of its whole edit history,
+which is not known yet while streaming.
+
+    python -m graph.streaming data/debate/ --write-feed feed.jsonl
+    python -m graph.streaming feed.jsonl --mode implicit --out events.jsonl
+    python -m graph.streaming feed.jsonl --burst-sketches sketches.json
+"""
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from graph.build_graphs import build_explicit_graph, extract_links
+from graph.implicit_index import similar_pairs
+from graph.ECA import entity_cluster_aggregation
+from graph.quantile import BurstSketches
+
+BURST_HISTORY_DAYS = 30
+
+
+class StreamingEventDetector:
+    def __init__(self, mode="implicit", delta_days=2, burst_percentile=90,
+                 similarity_threshold=0.3, gamma=0.8, burst_history_days=BURST_HISTORY_DAYS,
+                 burst_sketches=None):
+        self.mode = mode
+        self.delta_days = delta_days
+        self.burst_percentile = burst_percentile
+        self.similarity_threshold = similarity_threshold
+        self.gamma = gamma
+        self.burst_history_days = burst_history_days
+        self.burst_sketches = burst_sketches
+
+        self.day = None
+        self.day_edits = []
+        self.history = {}           # entity -> deque of (day, count) within the history window
+        self.active_days = deque()  # (day, entities active that day), oldest first
+        self.open_clusters = []
+        self.n_events = 0
+        self.late_edits = 0
+
+    def add(self, edit):
+        """Feed one edit; returns the events finalised by any day it closes."""
+        day = edit["timestamp"].date()
+        if self.day is not None and day < self.day:
+            self.late_edits += 1
+            return []
+        emitted = []
+        if self.day is not None and day > self.day:
+            emitted = self.close_day()
+        self.day = day
+        self.day_edits.append(edit)
+        return emitted
+
+    def flush(self):
+        """Close the open day and emit every remaining event."""
+        emitted = self.close_day() if self.day_edits else []
+        emitted += self.open_clusters
+        self.open_clusters = []
+        return emitted
+
+    def close_day(self):
+        day, edits = self.day, self.day_edits
+        self.day_edits = []
+
+        counts = defaultdict(int)
+        for e in edits:
+            counts[e["entity"]] += 1
+        bursting = self._update_bursts(day, counts)
+
+        if self.mode == "explicit":
+            graph = build_explicit_graph(edits, self.delta_days)
+        else:
+            graph = self._implicit_graph(edits, bursting)
+        if not graph:
+            return []
+
+        merged = list(self.open_clusters)
+        entity_cluster_aggregation({str(day): graph}, strategy=self.mode, gamma=self.gamma,
+                                   state=(merged, self.open_clusters), on_step=self._on_step)
+        opened = {id(c) for c in self.open_clusters}
+        return [c for c in merged if id(c) not in opened]
+
+    def _on_step(self, time, merged_events, prev_clusters):
+        for c in prev_clusters:
+            c["event_id"] = self.n_events
+            self.n_events += 1
+        self.open_clusters = prev_clusters
+
+    def _update_bursts(self, day, counts):
+        if self.burst_sketches is not None:
+            return {e for e, c in counts.items() if self.burst_sketches.add_day(e, c)}
+
+        horizon = day - timedelta(days=self.burst_history_days)
+        while self.active_days and self.active_days[0][0] <= horizon:
+            _, entities = self.active_days.popleft()
+            for entity in entities:
+                hist = self.history.get(entity)
+                while hist and hist[0][0] <= horizon:
+                    hist.popleft()
+                if not hist:
+                    self.history.pop(entity, None)
+
+        bursting = set()
+        for entity, count in counts.items():
+            hist = self.history.setdefault(entity, deque())
+            hist.append((day, count))
+            threshold = np.percentile([c for _, c in hist], self.burst_percentile)
+            if count >= threshold:
+                bursting.add(entity)
+        self.active_days.append((day, set(counts)))
+        return bursting
+
+    def _implicit_graph(self, edits, bursting):
+        token_sets = defaultdict(set)
+        for e in edits:
+            if e["entity"] in bursting:
+                for line in e.get("added", []):
+                    token_sets[e["entity"]].update(line.split())
+        graph = defaultdict(set)
+        for e1, e2, _ in similar_pairs(token_sets, self.similarity_threshold):
+            graph[e1].add(e2)
+            graph[e2].add(e1)
+        return graph
+
+
+# -----------------------
+# Feeds
+# -----------------------
+
+def write_feed(data_dir, path):
+    """Replay a stored dataset as a JSONL feed in timestamp order."""
+    from graph.build_graphs import build_all_edits
+
+    store = build_all_edits(data_dir)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in np.argsort(store.timestamp, kind="stable"):
+            edit = store[i]
+            f.write(json.dumps({"title": edit["entity"], "timestamp": edit["timestamp"].isoformat(),
+                                "added": edit["added"]}, ensure_ascii=False) + "\n")
+
+def iter_feed(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            added = record.get("added", [])
+            yield {
+                "entity": record["title"],
+                "timestamp": datetime.fromisoformat(record["timestamp"].replace("Z", "+00:00")),
+                "added": added,
+                "links_added": extract_links(added)
+            }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("source", help="JSONL feed, or a data directory with --write-feed")
+    parser.add_argument("--write-feed", help="write the data directory as a JSONL feed to this path")
+    parser.add_argument("--mode", default="implicit", choices=["explicit", "implicit"])
+    parser.add_argument("--delta-days", type=int, default=2)
+    parser.add_argument("--burst-percentile", type=float, default=90)
+    parser.add_argument("--burst-history-days", type=int, default=BURST_HISTORY_DAYS)
+    parser.add_argument("--similarity-threshold", type=float, default=0.3)
+    parser.add_argument("--gamma", type=float, default=0.8)
+    parser.add_argument("--burst-sketches", help="judge bursts with quantile sketches kept in this file")
+    parser.add_argument("--out", help="append finalised events to this JSONL file")
+    args = parser.parse_args()
+
+    if args.write_feed:
+        write_feed(args.source, args.write_feed)
+        sys.exit(0)
+
+    sketches = None
+    if args.burst_sketches:
+        if os.path.exists(args.burst_sketches):
+            sketches = BurstSketches.load(args.burst_sketches)
+        else:
+            sketches = BurstSketches(args.burst_percentile)
+    detector = StreamingEventDetector(args.mode, args.delta_days, args.burst_percentile,
+                                      args.similarity_threshold, args.gamma, args.burst_history_days,
+                                      sketches)
+    out = open(args.out, "a", encoding="utf-8") if args.out else None
+
+    def emit(events):
+        for event in events:
+            record = {"event_id": event["event_id"], "start": event["start"], "end": event["end"],
+                      "entities": sorted(event["entities"])}
+            print(f"🗓️ Event {record['event_id']}: {record['start']} → {record['end']} {record['entities']}")
+            if out:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+
+    for edit in iter_feed(args.source):
+        emit(detector.add(edit))
+    emit(detector.flush())
+    if detector.late_edits:
+        print(f"Dropped {detector.late_edits} out-of-order edits.")
+    if sketches is not None:
+        sketches.save(args.burst_sketches)
+    if out:
+        out.close()
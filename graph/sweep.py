@@ -0,0 +1,135 @@
+"""Parameter sweeps over one scoring pass of the temporal graphs.
+
+The temporal graphs are built once, weighted and at the loosest setting of
+the grid; every setting is then a filter over those scored edges followed by
+ECA:
+
+* implicit: edges are scored with the burst map of the lowest percentile and
+  the lowest similarity threshold. A higher percentile only removes burst
+  days (a day's token sets do not depend on it), so the graph of a setting
+  is the scored edges with similarity >= its threshold on days that are
+  burst days of both entities at its percentile.
+* explicit: edges are scored with the largest delta_days; an edge is in the
+  graph of a smaller delta_days when its smallest reciprocal-link gap is
+  still inside that window.
+
+Both give exactly the graphs a full run with that setting builds.
+
+    python -m graph.sweep data/debate/ --mode implicit \\
+        --similarity-threshold 0.2,0.3,0.4 --burst-percentile 80,90,95 --gamma 0.6,0.8 \\
+        --out outputs/debate_sweep.csv
+"""
+import os
+import csv
+import sys
+import argparse
+import itertools
+import numpy as np
+from datetime import date
+
+from graph.build_graphs import build_all_edits
+from graph.bursts import detect_bursts_batch
+from graph.ECA import entity_cluster_aggregation
+from graph.temporal import build_temporal_graphs
+
+COLUMNS = ["mode", "delta_days", "burst_percentile", "similarity_threshold", "gamma",
+           "graphs", "edges", "events", "entities", "mean_size", "max_size",
+           "mean_days", "max_days"]
+
+
+def event_summary(events):
+    sizes = [len(e["entities"]) for e in events]
+    days = [(date.fromisoformat(e["end"]) - date.fromisoformat(e["start"])).days + 1 for e in events]
+    return {
+        "events": len(events),
+        "entities": len(set().union(*(e["entities"] for e in events))) if events else 0,
+        "mean_size": float(np.mean(sizes)) if sizes else 0.0,
+        "max_size": max(sizes, default=0),
+        "mean_days": float(np.mean(days)) if days else 0.0,
+        "max_days": max(days, default=0),
+    }
+
+def _threshold(scored, keep):
+    graphs = {}
+    for day, graph in scored.items():
+        g = {}
+        for e1, nbrs in graph.items():
+            kept = {e2 for e2, w in nbrs.items() if keep(day, e1, e2, w)}
+            if kept:
+                g[e1] = kept
+        if g:
+            graphs[day] = g
+    return graphs
+
+def _run_eca(graphs, mode, gammas, setting):
+    edges = sum(len(n) for g in graphs.values() for n in g.values()) // 2
+    for gamma in gammas:
+        events = entity_cluster_aggregation(graphs, strategy=mode, gamma=gamma)
+        yield {**setting, "gamma": gamma, "graphs": len(graphs), "edges": edges, **event_summary(events)}
+
+def sweep_implicit(store, similarity_thresholds, burst_percentiles, gammas, engine="index", workers=None):
+    bursts = {p: detect_bursts_batch(store, p) for p in sorted(set(burst_percentiles))}
+    scored, _ = build_temporal_graphs(store, "implicit", bursts[min(bursts)],
+                                      similarity_threshold=min(similarity_thresholds),
+                                      engine=engine, workers=workers, weighted=True)
+    for p, s in itertools.product(sorted(bursts), sorted(set(similarity_thresholds))):
+        burst_map = bursts[p]
+        keep = lambda day, e1, e2, sim: (sim >= s and date.fromisoformat(day) in burst_map[e1]
+                                         and date.fromisoformat(day) in burst_map[e2])
+        setting = {"mode": "implicit", "burst_percentile": p, "similarity_threshold": s}
+        yield from _run_eca(_threshold(scored, keep), "implicit", gammas, setting)
+
+def sweep_explicit(store, delta_days, gammas, workers=None):
+    scored, _ = build_temporal_graphs(store, "explicit", delta_days=max(delta_days),
+                                      workers=workers, weighted=True)
+    for d in sorted(set(delta_days)):
+        window = (d + 1) * 86400
+        keep = lambda day, e1, e2, weight: weight[1] < window
+        yield from _run_eca(_threshold(scored, keep), "explicit", gammas, {"mode": "explicit", "delta_days": d})
+
+def write_table(rows, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def print_table(rows, out=sys.stdout):
+    columns = [c for c in COLUMNS if any(c in r for r in rows)]
+    cells = [[f"{r[c]:.2f}" if isinstance(r.get(c), float) else str(r.get(c, "")) for c in columns] for r in rows]
+    widths = [max(len(c), *(len(row[i]) for row in cells)) for i, c in enumerate(columns)]
+    print("  ".join(c.rjust(w) for c, w in zip(columns, widths)), file=out)
+    for row in cells:
+        print("  ".join(v.rjust(w) for v, w in zip(row, widths)), file=out)
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+def _ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("data_dir")
+    parser.add_argument("--mode", default="implicit", choices=["explicit", "implicit"])
+    parser.add_argument("--similarity-threshold", type=_floats, default=[0.2, 0.3, 0.4])
+    parser.add_argument("--burst-percentile", type=_floats, default=[80, 90, 95])
+    parser.add_argument("--delta-days", type=_ints, default=[1, 2, 3])
+    parser.add_argument("--gamma", type=_floats, default=[0.6, 0.7, 0.8, 0.9])
+    parser.add_argument("--engine", default="index", choices=["index", "pairwise"])
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", help="write the summary table to this CSV file")
+    args = parser.parse_args()
+
+    store = build_all_edits(args.data_dir)
+    if args.mode == "implicit":
+        rows = sweep_implicit(store, args.similarity_threshold, args.burst_percentile, args.gamma,
+                              engine=args.engine, workers=args.workers)
+    else:
+        rows = sweep_explicit(store, args.delta_days, args.gamma, workers=args.workers)
+    rows = list(rows)
+    print_table(rows)
+    if args.out:
+        write_table(rows, args.out)
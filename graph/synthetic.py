@@ -0,0 +1,111 @@
+"""Seeded synthetic edit histories in the collector's ``edits_<entity>.json`` schema.
+
+Every entity gets `edits_per_entity` background edits on uniformly random
+days, whose added lines draw words from a Zipf-distributed vocabulary of
+`vocab_size` words and which link a random other entity with probability
+`link_density`. On top of that, `n_events` planted events each pick
+`event_size` entities and a run of `event_days` days; every member gets
+`burst_edits` extra edits per event day that use the event's own topic
+words and link the other members, so the planted events show up as bursts,
+as implicit-graph components and as reciprocal links.
+
+    python -m graph.synthetic /tmp/synthetic --n-entities 2000 --seed 1
+
+Same parameters and seed, same files.
+"""
+import os
+import json
+import argparse
+import numpy as np
+from datetime import datetime, timedelta, timezone
+
+DEFAULTS = {
+    "n_entities": 1000,
+    "edits_per_entity": 20,
+    "days": 60,
+    "n_events": 20,
+    "event_size": 5,
+    "event_days": 3,
+    "burst_edits": 4,
+    "link_density": 0.1,
+    "vocab_size": 5000,
+    "topic_words": 40,
+    "words_per_line": 12,
+    "lines_per_edit": 2,
+    "seed": 0,
+}
+START = datetime(2021, 9, 1, tzinfo=timezone.utc)
+
+
+def _timestamp(rng, day):
+    return (START + timedelta(days=int(day), seconds=int(rng.integers(86400)))).isoformat()
+
+def _line(words, link=None):
+    line = " ".join(words)
+    return f"{line} [[{link}]]" if link else line
+
+def generate_dataset(out_dir, **params):
+    """Write one edits_<entity>.json per entity to `out_dir`; returns the
+    planted events as [{"entities", "start", "end"}] (dates as YYYY-MM-DD)."""
+    unknown = set(params) - set(DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown generator parameters: {sorted(unknown)}")
+    p = {**DEFAULTS, **params}
+    rng = np.random.default_rng(p["seed"])
+    os.makedirs(out_dir, exist_ok=True)
+
+    entities = [f"Entity {i}" for i in range(p["n_entities"])]
+    vocab = np.array([f"w{i}" for i in range(p["vocab_size"])])
+    zipf = 1 / np.arange(1, p["vocab_size"] + 1)
+    zipf /= zipf.sum()
+
+    shape = (p["edits_per_entity"], p["lines_per_edit"], p["words_per_line"])
+    edits = {e: [] for e in entities}
+    for e in entities:
+        words = vocab[rng.choice(p["vocab_size"], size=shape, p=zipf)]
+        days = rng.integers(p["days"], size=p["edits_per_entity"])
+        links = rng.integers(len(entities), size=p["edits_per_entity"])
+        linking = rng.random(p["edits_per_entity"]) < p["link_density"]
+        for j, day in enumerate(days):
+            link = entities[links[j]] if linking[j] else None
+            added = [_line(w) for w in words[j, :-1]] + [_line(words[j, -1], link)]
+            edits[e].append({"title": e, "timestamp": _timestamp(rng, day), "added": added, "deleted": []})
+
+    events = []
+    size = min(p["event_size"], len(entities))
+    for k in range(p["n_events"]):
+        members = [entities[i] for i in rng.choice(len(entities), size=size, replace=False)]
+        first = int(rng.integers(max(p["days"] - p["event_days"] + 1, 1)))
+        topic = np.array([f"event{k}_t{i}" for i in range(p["topic_words"])])
+        for day in range(first, first + p["event_days"]):
+            for e in members:
+                for _ in range(p["burst_edits"]):
+                    link = members[rng.integers(len(members))]
+                    words = topic[rng.integers(len(topic), size=shape[1:])]
+                    added = [_line(w) for w in words[:-1]] + [_line(words[-1], link if link != e else None)]
+                    edits[e].append({"title": e, "timestamp": _timestamp(rng, day), "added": added,
+                                     "deleted": []})
+        events.append({"entities": sorted(members),
+                       "start": (START + timedelta(days=first)).date().isoformat(),
+                       "end": (START + timedelta(days=first + p["event_days"] - 1)).date().isoformat()})
+
+    for e, entity_edits in edits.items():
+        entity_edits.sort(key=lambda r: r["timestamp"])
+        with open(os.path.join(out_dir, f"edits_{e}.json"), "w", encoding="utf-8") as f:
+            json.dump(entity_edits, f, ensure_ascii=False, indent=2)
+    return events
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out_dir")
+    for key, default in DEFAULTS.items():
+        parser.add_argument("--" + key.replace("_", "-"), dest=key, type=type(default), default=default)
+    parser.add_argument("--truth", help="also write the planted events to this JSON file")
+    args = vars(parser.parse_args())
+    out_dir, truth = args.pop("out_dir"), args.pop("truth")
+    events = generate_dataset(out_dir, **args)
+    if truth:
+        with open(truth, "w", encoding="utf-8") as f:
+            json.dump(events, f, indent=2)
+    print(f"Wrote {args['n_entities']} entities and {len(events)} planted events to {out_dir}")
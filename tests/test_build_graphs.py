@@ -0,0 +1,45 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+from graph.build_graphs import reciprocal_link_weights, reciprocal_links
+
+START = datetime(2021, 9, 1, tzinfo=timezone.utc)
+
+
+def _edits(seed, n=300, entities=8, days=10):
+    rng = random.Random(seed)
+    names = [f"E{i}" for i in range(entities)]
+    return [{"entity": rng.choice(names),
+             "timestamp": START + timedelta(seconds=rng.randrange(days * 86400)),
+             "links_added": set(rng.sample(names, rng.randrange(3)))} for _ in range(n)]
+
+def _linked_pairs(edits):
+    for a in edits:
+        for b in edits:
+            e1, e2 = a["entity"], b["entity"]
+            if e1 <= e2 and e2 in a["links_added"] and e1 in b["links_added"]:
+                yield e1, e2, b["timestamp"] - a["timestamp"]
+
+def _brute_force_links(edits, delta_days):
+    # the original nested-loop predicate, which saw every pair from both sides
+    return {(e1, e2) for e1, e2, d in _linked_pairs(edits) if min(abs(d.days), abs((-d).days)) <= delta_days}
+
+def _brute_force_weights(edits, delta_days):
+    weights = {}
+    for e1, e2, d in _linked_pairs(edits):
+        gap = abs(d.total_seconds())
+        if gap < (delta_days + 1) * 86400:
+            count, best = weights.get((e1, e2), (0, gap))
+            weights[e1, e2] = (count + 1, min(best, gap))
+    return weights
+
+
+def test_reciprocal_links_match_brute_force():
+    for seed in range(5):
+        edits = _edits(seed)
+        for delta_days in (0, 1, 2):
+            links = list(reciprocal_links(edits, delta_days))
+            assert len(links) == len(set(links))
+            assert set(links) == _brute_force_links(edits, delta_days)
+            weights = {(e1, e2): (count, gap) for e1, e2, count, gap in reciprocal_link_weights(edits, delta_days)}
+            assert weights == _brute_force_weights(edits, delta_days)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from graph.build_graphs import build_all_edits, detect_bursts
+from graph.bursts import detect_bursts_batch, percentile_thresholds
+from graph.synthetic import generate_dataset
+
+
+def test_percentile_thresholds_match_np_percentile():
+    rng = np.random.default_rng(0)
+    row_ids = np.sort(rng.integers(0, 50, size=2000))
+    values = rng.integers(1, 30, size=2000)
+    for q in (0, 10, 50, 90, 95, 100, 33.3):
+        rows, thresholds = percentile_thresholds(row_ids, values, q)
+        assert list(rows) == sorted(set(row_ids.tolist()))
+        expected = [np.percentile(values[row_ids == r], q) for r in rows]
+        assert thresholds.tolist() == expected
+
+@pytest.mark.parametrize("percentile", [50, 90, 99])
+def test_batch_matches_per_entity_detect_bursts(tmp_path, percentile):
+    generate_dataset(str(tmp_path), n_entities=80, edits_per_entity=15, days=30, n_events=5, seed=1)
+    store = build_all_edits(str(tmp_path))
+    burst_map = detect_bursts_batch(store, percentile)
+    by_entity = store.group_by_entity()
+    assert len(burst_map) == len(by_entity)
+    for entity, idx in by_entity.items():
+        assert burst_map[entity] == detect_bursts(store.edits(idx), percentile)
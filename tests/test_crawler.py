@@ -0,0 +1,91 @@
+import os
+import sys
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "data"))
+
+from crawler import TokenBucket, crawl
+from crawl_store import CrawlStore
+from mediawiki_standin import StandInWiki
+
+CLIENT = {"limiter": TokenBucket(rate=1000, burst=1000), "retries": 3}
+
+
+def _wiki(n=60, **options):
+    # a hub page linked to and from n others
+    pages = {f"Page {i}": {"extract": f"Intro of page {i}.", "links": ["Hub"]} for i in range(n)}
+    pages["Hub"] = {"extract": "Intro of the hub.", "links": [f"Page {i}" for i in range(n)]}
+    return StandInWiki(pages, **options)
+
+def _crawl(wiki, titles, **options):
+    seen, missing = {}, []
+
+    def on_page(page_title, page, linked, backlinks):
+        seen[page_title] = (page, linked, backlinks)
+
+    async def run():
+        async with wiki.serving() as (api_base, wiki_base):
+            return await crawl(titles, on_page, on_missing=missing.append,
+                               api_base=api_base, wiki_base=wiki_base, **{**CLIENT, **options})
+
+    stats = asyncio.run(run())
+    return seen, missing, stats
+
+
+def test_crawl_follows_continuations():
+    wiki = _wiki(extract_limit=20, backlink_page=7)
+    seen, missing, stats = _crawl(wiki, ["Hub"])
+    page, linked, backlinks = seen["Hub"]
+    assert page["first_paragraph"] == "Intro of the hub."
+    assert sorted(p["title"] for p in linked) == sorted(f"Page {i}" for i in range(60))
+    assert sorted(p["title"] for p in backlinks) == sorted(f"Page {i}" for i in range(60))
+    # every intro arrived, 20 per response
+    assert all(p["first_paragraph"].startswith("Intro of page") for p in linked + backlinks)
+    assert any("blcontinue" in r for r in wiki.requests)
+    assert any("excontinue" in r for r in wiki.requests)
+    assert not missing and stats["errors"] == 0
+
+def test_crawl_retries_maxlag_and_429():
+    wiki = _wiki(n=5)
+    wiki.maxlag, wiki.throttle = 2, 2
+    seen, missing, stats = _crawl(wiki, ["Hub"])
+    assert len(seen["Hub"][1]) == 5
+    assert stats["throttled"] == 4 and stats["retries"] == 4
+    assert all(r.get("maxlag") == "5" for r in wiki.requests if "action" in r)
+
+def _crawl_into(store, wiki, titles, **options):
+    def on_page(page_title, page, linked, backlinks):
+        store.record_page(page_title, {**page, "linked_pages": linked, "what_links_here": backlinks}, 0)
+
+    async def run():
+        async with wiki.serving() as (api_base, wiki_base):
+            await crawl(titles, on_page, on_missing=store.mark_missing,
+                        api_base=api_base, wiki_base=wiki_base, **{**CLIENT, **options})
+
+    asyncio.run(run())
+
+def _states(store):
+    return dict(store.db.execute("SELECT title, state FROM frontier"))
+
+def test_only_pages_the_api_reports_missing_are_marked_missing(tmp_path):
+    store = CrawlStore(str(tmp_path / "crawl.sqlite"))
+    store.seed(["Hub", "No such page"])
+    _crawl_into(store, _wiki(n=3), ["Hub", "No such page"])
+    states = _states(store)
+    assert states["Hub"] == "done" and states["No such page"] == "missing"
+    assert store.pending(0) == []
+
+def test_failed_fetches_stay_pending(tmp_path):
+    store = CrawlStore(str(tmp_path / "crawl.sqlite"))
+    store.seed(["Hub", "Page 0"])
+    wiki = _wiki(n=3)
+    wiki.down = True
+    _crawl_into(store, wiki, ["Hub"], retries=0)
+    wiki.down, wiki.broken = False, {"Page 0"}
+    _crawl_into(store, wiki, ["Page 0"], retries=0)
+    assert store.pending(0) == ["Hub", "Page 0"]
+
+    wiki.broken = set()
+    _crawl_into(store, wiki, store.pending(0))
+    assert store.pending(0) == []
+    assert set(_states(store).values()) <= {"done", "pending"}
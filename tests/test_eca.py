@@ -0,0 +1,52 @@
+import random
+
+import networkx as nx
+
+from graph.ECA import _cliques, entity_cluster_aggregation
+from graph.csr import CSRGraph
+
+
+def _random_days(seed, n_days=6, n_nodes=30, p=0.25):
+    rng = random.Random(seed)
+    titles = [f"entity {i}" for i in range(n_nodes)]
+    days = {}
+    for d in range(n_days):
+        edges = [(a, b) for i, a in enumerate(titles) for b in titles[i + 1:] if rng.random() < p]
+        days[f"2021-09-{d + 1:02d}"] = edges
+    return titles, days
+
+def _dict_graph(edges):
+    graph = {}
+    for a, b in edges:
+        graph.setdefault(a, set()).add(b)
+        graph.setdefault(b, set()).add(a)
+    return graph
+
+def _csr_graph(edges, titles, seed):
+    # same graph, nodes numbered in a different order
+    shuffled = list(edges)
+    random.Random(seed).shuffle(shuffled)
+    return CSRGraph.from_edges(shuffled, titles, {t: i for i, t in enumerate(titles)})
+
+
+def test_cliques_match_networkx():
+    titles, days = _random_days(0)
+    for edges in days.values():
+        expected = {frozenset(c) for c in nx.find_cliques(nx.Graph(edges)) if len(c) >= 3}
+        cliques, exact = _cliques(_dict_graph(edges))
+        assert exact
+        assert {frozenset(c) for c in cliques} == expected
+
+def test_clique_order_independent_of_node_numbering():
+    titles, days = _random_days(1)
+    for seed, edges in enumerate(days.values()):
+        assert _cliques(_dict_graph(edges)) == _cliques(_csr_graph(edges, titles, seed))
+
+def test_explicit_eca_independent_of_graph_representation():
+    titles, days = _random_days(2)
+    for gamma in (0.3, 0.5, 0.8):
+        as_dicts = {day: _dict_graph(edges) for day, edges in days.items()}
+        as_csr = {day: _csr_graph(edges, titles, k) for k, (day, edges) in enumerate(days.items())}
+        expected = entity_cluster_aggregation(as_dicts, strategy="explicit", gamma=gamma)
+        assert expected
+        assert entity_cluster_aggregation(as_csr, strategy="explicit", gamma=gamma) == expected
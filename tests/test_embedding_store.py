@@ -0,0 +1,40 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "data"))
+
+from embedding_store import EmbeddingStore
+
+
+def _vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+def test_torn_tail_row(tmp_path):
+    path = str(tmp_path / "emb")
+    vecs = _vectors(5)
+    EmbeddingStore(path).add_many([f"t{i}" for i in range(5)], vecs)
+    # a crashed writer: one whole unindexed row, then half a row
+    with open(os.path.join(path, "vectors.bin"), "ab") as f:
+        f.write(_vectors(1, seed=1).tobytes() + b"\0" * 16)
+
+    reader = EmbeddingStore(path)
+    assert np.array_equal(reader.get_many(["t4", "t0"]), vecs[[4, 0]])
+    assert reader.vectors().shape == (6, 8)
+
+    more = _vectors(2, seed=2)
+    assert EmbeddingStore(path).add_many(["u0", "u1"], more) == 2
+    assert os.path.getsize(os.path.join(path, "vectors.bin")) == 7 * 8 * 4
+    fresh = EmbeddingStore(path, hot_cache=0)
+    assert np.array_equal(fresh.get_many(["t0", "u0", "u1"]), np.vstack([vecs[:1], more]))
+
+def test_float16_reads_match_with_and_without_hot_cache(tmp_path):
+    path = str(tmp_path / "emb")
+    vecs = _vectors(3)
+    store = EmbeddingStore(path, dtype="float16")
+    store.add_many(["a", "b", "c"], vecs)
+    cached = store.get_many(["a", "b", "c"])
+    cold = EmbeddingStore(path, hot_cache=0).get_many(["a", "b", "c"])
+    assert np.array_equal(cached, cold)
+    assert np.array_equal(cold, vecs.astype(np.float16).astype(np.float32))
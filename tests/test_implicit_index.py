@@ -0,0 +1,62 @@
+import random
+from itertools import combinations
+
+import pytest
+
+from graph.build_graphs import build_all_edits, build_implicit_graph, detect_bursts
+from graph.implicit_index import similar_pairs
+from graph.synthetic import generate_dataset
+
+
+def _all_pairs(token_sets, threshold):
+    out = {}
+    for a, b in combinations(token_sets, 2):
+        sa, sb = token_sets[a], token_sets[b]
+        if sa and sb:
+            sim = len(sa & sb) / len(sa | sb)
+            if sim >= threshold:
+                out[frozenset((a, b))] = sim
+    return out
+
+def _pairs(token_sets, threshold):
+    out = {}
+    for a, b, sim in similar_pairs(token_sets, threshold):
+        key = frozenset((a, b))
+        assert key not in out
+        out[key] = sim
+    return out
+
+
+@pytest.mark.parametrize("threshold", [0.1, 0.2, 0.3, 1 / 3, 0.5, 0.75, 1.0])
+def test_similar_pairs_match_all_pairs(threshold):
+    rng = random.Random(0)
+    for _ in range(30):
+        vocab = [f"w{i}" for i in range(rng.randrange(4, 15))]
+        token_sets = {f"e{k}": set(rng.sample(vocab, rng.randrange(0, len(vocab))))
+                      for k in range(rng.randrange(2, 12))}
+        assert _pairs(token_sets, threshold) == _all_pairs(token_sets, threshold)
+
+def test_threshold_boundary_is_inclusive():
+    # Jaccard exactly 3/10, 1/3 (as 2/6) and 1/2
+    token_sets = {"a": set("abcdefg"), "b": set("abchijk"),            # 3 / 11
+                  "c": set("abcdefgh"), "d": set("abcxy"),             # 3 / 10
+                  "e": set("pqrs"), "f": set("pqtu"),                  # 2 / 6
+                  "g": set("mn"), "h": set("mno")}                     # 2 / 3
+    for threshold in (0.3, 1 / 3, 0.5, 2 / 3):
+        assert _pairs(token_sets, threshold) == _all_pairs(token_sets, threshold)
+    assert frozenset("cd") in _pairs(token_sets, 0.3)
+    assert frozenset("ef") in _pairs(token_sets, 1 / 3)
+
+def test_index_engine_matches_pairwise(tmp_path):
+    generate_dataset(str(tmp_path), n_entities=60, edits_per_entity=10, days=15, n_events=6,
+                     vocab_size=300, seed=2)
+    edits = build_all_edits(str(tmp_path), use_store=False)
+    by_entity = {}
+    for e in edits:
+        by_entity.setdefault(e["entity"], []).append(e)
+    burst_map = {entity: detect_bursts(es, 90) for entity, es in by_entity.items()}
+    for threshold in (0.1, 0.3, 0.5):
+        expected = build_implicit_graph(edits, burst_map, threshold, engine="pairwise", weighted=True)
+        assert any(expected.values())
+        got = build_implicit_graph(edits, burst_map, threshold, engine="index", weighted=True)
+        assert {e: dict(n) for e, n in got.items() if n} == {e: dict(n) for e, n in expected.items() if n}
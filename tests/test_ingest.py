@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+from graph.ingest import iter_json_array
+
+TEXT = json.dumps([1.5, -0.25, 12e3, 1E-7, 0, -7, 123456789, 2.5e+10, "1.5e3", True, None,
+                   {"a": [1.25, {"b": 3e-2}], "c": "x, y ]"}, [], {}, 98.6], indent=1)
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "items.json"
+    path.write_text(TEXT, encoding="utf-8")
+    return str(path)
+
+def test_every_chunk_size_decodes_like_json_load(path):
+    expected = json.loads(TEXT)
+    for chunk_size in range(1, len(TEXT) + 1):
+        assert list(iter_json_array(path, chunk_size=chunk_size)) == expected, chunk_size
+
+def test_compact_numbers_split_across_chunks(tmp_path):
+    path = tmp_path / "numbers.json"
+    path.write_text("[1.5,12e3,-0.125,7]", encoding="utf-8")
+    for chunk_size in range(1, 20):
+        assert list(iter_json_array(str(path), chunk_size=chunk_size)) == [1.5, 12e3, -0.125, 7]
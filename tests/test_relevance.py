@@ -0,0 +1,25 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, "data"))
+
+from relevance import iter_json_object
+
+DOCS = {"key0": 1.5, "key1": {"title": "T", "scores": [12e3, -0.25, 1E-7, 2.5e+10]},
+        "kéy, 2": [{"a": 3e-2}, "1.5e3", None, True, 98.6], "empty": {}, "last": -7}
+
+
+def test_every_chunk_size_decodes_like_json_load(tmp_path):
+    for text in (json.dumps(DOCS), json.dumps(DOCS, indent=2, ensure_ascii=False)):
+        path = tmp_path / "docs.json"
+        path.write_text(text, encoding="utf-8")
+        with open(path, encoding="utf-8") as f:
+            expected = list(json.load(f).items())
+        for chunk_size in range(1, len(text) + 1):
+            assert list(iter_json_object(str(path), chunk_size=chunk_size)) == expected, chunk_size
+
+def test_empty_object(tmp_path):
+    path = tmp_path / "empty.json"
+    path.write_text(" { } ", encoding="utf-8")
+    assert list(iter_json_object(str(path), chunk_size=1)) == []
@@ -0,0 +1,46 @@
+import pytest
+
+from graph.build_graphs import build_all_edits
+from graph.pipeline import load_config, run_pipeline
+from graph.stage_cache import _load_graphs, _save_graphs
+from graph.synthetic import generate_dataset
+from graph.temporal import build_temporal_graphs
+
+SYNTHETIC = {"n_entities": 150, "edits_per_entity": 8, "days": 20, "n_events": 6,
+             "link_density": 0.3, "vocab_size": 800, "seed": 3}
+
+
+@pytest.fixture(scope="module")
+def data_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("synthetic")
+    generate_dataset(str(path), **SYNTHETIC)
+    return str(path)
+
+def _run(data_dir, out_dir, **overrides):
+    config = load_config(overrides={"data_dir": data_dir, "output_dir": str(out_dir),
+                                    "graph_workers": 1, "export_workers": 1, **overrides})
+    return run_pipeline(config)
+
+def _hit(report, stage):
+    return [r["hit"] for r in report["cache"]["stages"] if r["stage"] == stage]
+
+
+@pytest.mark.parametrize("mode", ["explicit", "implicit"])
+def test_graphs_cache_hit_gives_the_same_events(data_dir, tmp_path, mode):
+    cache_dir = str(tmp_path / "cache")
+    _run(data_dir, tmp_path / "a", mode=mode, jaccard_threshold=0.8, cache_dir=cache_dir)
+    events, report = _run(data_dir, tmp_path / "b", mode=mode, jaccard_threshold=0.3, cache_dir=cache_dir)
+    assert _hit(report, "graphs") == [True] and _hit(report, "events") == [False]
+
+    expected, _ = _run(data_dir, tmp_path / "c", mode=mode, jaccard_threshold=0.3, stage_cache=False)
+    assert expected
+    assert events == expected
+
+def test_graphs_round_trip_keeps_node_order(data_dir, tmp_path):
+    graphs, _ = build_temporal_graphs(build_all_edits(data_dir), "explicit", workers=1)
+    _save_graphs(graphs, str(tmp_path))
+    loaded = _load_graphs(str(tmp_path))
+    assert list(loaded) == list(graphs)
+    for day, graph in graphs.items():
+        assert list(loaded[day]) == list(graph)
+        assert all(loaded[day][t] == graph[t] for t in graph)